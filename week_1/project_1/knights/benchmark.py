@@ -0,0 +1,148 @@
+import csv
+import json
+import random
+import sys
+import time
+
+from logic import And, MODEL_CHECK_BACKENDS, Not, Or, Symbol, model_check
+from logic import model_check_many
+from puzzle import exclusive_or, knowledge_by_sentence
+
+# Largest number of symbols each backend is timed on, since the backends
+# that enumerate all 2^n models become impractical long before the others
+MAX_SYMBOLS = {
+    "enumerate": 12,
+    "compiled": 18,
+    "many": 18,
+    "numpy": 20,
+    "pruned": 40,
+    "sat": 200
+}
+
+REPEATS = 3
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python benchmark.py [max_characters] "
+                 "[results.csv|results.json]")
+    max_characters = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    output = sys.argv[2] if len(sys.argv) > 2 else None
+
+    results = []
+    for n_characters in range(1, max_characters + 1):
+        knowledge, queries = generate_puzzle(
+            n_characters, n_statements=2 * n_characters, seed=n_characters
+        )
+        answers = {}
+        for backend in list(MODEL_CHECK_BACKENDS) + ["many"]:
+            if 2 * n_characters > MAX_SYMBOLS.get(backend, 0):
+                continue
+            seconds, answers[backend] = time_backend(knowledge, queries, backend)
+            results.append({
+                "characters": n_characters,
+                "symbols": 2 * n_characters,
+                "backend": backend,
+                "seconds": seconds
+            })
+            print(f"{n_characters:3} characters  {backend:10} "
+                  f"{1e3 * seconds:10.3f} ms")
+
+        # Every backend must entail exactly the same queries
+        if len(set(answers.values())) > 1:
+            sys.exit(f"Backends disagree with {n_characters} characters: "
+                     f"{answers}")
+
+    if output and output.endswith(".json"):
+        with open(output, "w") as f:
+            json.dump(results, f, indent=2)
+    elif output:
+        with open(output, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+
+def generate_puzzle(n_characters, n_statements, seed=None):
+    """
+    Generates a random knights and knaves puzzle with `n_characters`
+    characters and `n_statements` statements. Returns its knowledge base and
+    the list of queries to ask about it, the knight and knave symbols of
+    every character.
+
+    A hidden role is drawn for every character, and every statement is
+    negated if needed so that knights tell the truth and knaves lie about
+    the hidden roles: generated puzzles always have a solution.
+    """
+    rng = random.Random(seed)
+    knights = [Symbol(f"{k} is a Knight") for k in range(n_characters)]
+    knaves = [Symbol(f"{k} is a Knave") for k in range(n_characters)]
+    roles = {
+        knight.name: rng.random() < 0.5 for knight in knights
+    }
+    roles.update({
+        knave.name: not roles[knight.name]
+        for knight, knave in zip(knights, knaves)
+    })
+
+    knowledge = [
+        exclusive_or(knight, knave) for knight, knave in zip(knights, knaves)
+    ]
+    for _ in range(n_statements):
+        speaker = rng.randrange(n_characters)
+        statement = random_statement(rng, knights, knaves)
+        if statement.evaluate(roles) != roles[knights[speaker].name]:
+            statement = Not(statement)
+        knowledge.append(
+            knowledge_by_sentence(statement, knights[speaker], knaves[speaker])
+        )
+
+    return And(*knowledge), knights + knaves
+
+
+def random_statement(rng, knights, knaves):
+    """
+    Returns a random claim about one or two characters: what one of them
+    is, that both claims hold, that either holds, or that two characters
+    are of the same kind.
+    """
+    def claim():
+        k = rng.randrange(len(knights))
+        return knights[k] if rng.random() < 0.5 else knaves[k]
+
+    kind = rng.randrange(4)
+    if kind == 0:
+        return claim()
+    elif kind == 1:
+        return And(claim(), claim())
+    elif kind == 2:
+        return Or(claim(), claim())
+    a, b = rng.sample(range(len(knights)), 2) if len(knights) > 1 else (0, 0)
+    return exclusive_or(
+        And(knights[a], knights[b]), And(knaves[a], knaves[b])
+    )
+
+
+def time_backend(knowledge, queries, backend):
+    """
+    Returns the best time, over `REPEATS` runs, that `backend` takes to
+    check every query, and the tuple of entailed queries.
+    """
+    best = None
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        if backend == "many":
+            entailments, _ = model_check_many(knowledge, queries)
+            entailed = tuple(query for query in queries if entailments[query])
+        else:
+            entailed = tuple(
+                query for query in queries
+                if model_check(knowledge, query, backend=backend)
+            )
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, entailed
+
+
+if __name__ == "__main__":
+    main()
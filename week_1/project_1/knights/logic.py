@@ -1,19 +1,90 @@
+import collections
+import functools
 import itertools
+import operator
+import weakref
 
 
 class Sentence():
+    """
+    Immutable node of a logical sentence.
+
+    Sentences are hash-consed: building a sentence equal to one that is still
+    alive returns that same object. Identical subformulas are thus shared,
+    equality is identity, and each node computes its hash and its set of
+    symbols once, when it is created.
+    """
+
+    __slots__ = ("_hash", "_symbols", "__weakref__")
+
+    # Live sentences by class and structure
+    _nodes = weakref.WeakValueDictionary()
+
+    @classmethod
+    def node(cls, key, symbols, **fields):
+        """
+        Returns the sentence of class `cls` whose structure is `key`, a tuple
+        of its fields, creating it with `fields` and `symbols` if needed.
+        """
+        sentence = Sentence._nodes.get((cls, key))
+        if sentence is None:
+            sentence = object.__new__(cls)
+            for name, value in fields.items():
+                object.__setattr__(sentence, name, value)
+            object.__setattr__(sentence, "_symbols", frozenset(symbols))
+            object.__setattr__(sentence, "_hash", hash((cls.__name__, key)))
+            Sentence._nodes[cls, key] = sentence
+        return sentence
+
+    def __setattr__(self, name, value):
+        raise AttributeError("logical sentences are immutable")
+
+    def __eq__(self, other):
+        return self is other
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        # Rebuild copies through the constructor so that they are shared too
+        return (type(self), self.__getnewargs__())
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
         raise Exception("nothing to evaluate")
 
+    def evaluate_partial(self, model):
+        """
+        Evaluates the logical sentence in a partial model, which may leave
+        symbols unassigned. Returns True or False if every completion of the
+        model agrees on the value of the sentence, and None otherwise.
+        """
+        raise Exception("nothing to evaluate")
+
+    def expression(self, index):
+        """
+        Returns a Python expression that evaluates the logical sentence on a
+        model given as an integer bitmask `m`, where symbol `name` is true
+        if bit `index[name]` of `m` is set.
+        """
+        raise Exception("nothing to compile")
+
+    def evaluate_columns(self, columns):
+        """
+        Evaluates the logical sentence on many models at once. `columns` maps
+        each symbol to a boolean array with its value in every model; the
+        result is a boolean array (or a bool, if constant) with the value of
+        the sentence in every model.
+        """
+        raise Exception("nothing to evaluate")
+
     def formula(self):
         """Returns string formula representing logical sentence."""
         return ""
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(self._symbols)
 
     @classmethod
     def validate(cls, sentence):
@@ -44,14 +115,13 @@ class Sentence():
 
 class Symbol(Sentence):
 
-    def __init__(self, name):
-        self.name = name
+    __slots__ = ("name",)
 
-    def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+    def __new__(cls, name):
+        return cls.node((name,), (name,), name=name)
 
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    def __getnewargs__(self):
+        return (self.name,)
 
     def __repr__(self):
         return self.name
@@ -62,23 +132,36 @@ class Symbol(Sentence):
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def evaluate_partial(self, model):
+        value = model.get(self.name)
+        return None if value is None else bool(value)
+
+    def expression(self, index):
+        try:
+            return f"(m & {1 << index[self.name]} != 0)"
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
+    def evaluate_columns(self, columns):
+        try:
+            return columns[self.name]
+        except KeyError:
+            raise Exception(f"variable {self.name} not in model")
+
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
-
 
 class Not(Sentence):
-    def __init__(self, operand):
-        Sentence.validate(operand)
-        self.operand = operand
 
-    def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+    __slots__ = ("operand",)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    def __new__(cls, operand):
+        Sentence.validate(operand)
+        return cls.node((operand,), operand._symbols, operand=operand)
+
+    def __getnewargs__(self):
+        return (self.operand,)
 
     def __repr__(self):
         return f"Not({self.operand})"
@@ -86,26 +169,35 @@ class Not(Sentence):
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
+    def evaluate_partial(self, model):
+        value = self.operand.evaluate_partial(model)
+        return None if value is None else not value
+
+    def expression(self, index):
+        return f"(not {self.operand.expression(index)})"
+
+    def evaluate_columns(self, columns):
+        # Unlike `~`, `^ True` negates plain bools as well as boolean arrays
+        return self.operand.evaluate_columns(columns) ^ True
+
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
-
 
 class And(Sentence):
-    def __init__(self, *conjuncts):
-        for conjunct in conjuncts:
-            Sentence.validate(conjunct)
-        self.conjuncts = list(conjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+    __slots__ = ("conjuncts",)
 
-    def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
+    def __new__(cls, *conjuncts):
+        for conjunct in conjuncts:
+            Sentence.validate(conjunct)
+        symbols = frozenset().union(
+            *(conjunct._symbols for conjunct in conjuncts)
         )
+        return cls.node(conjuncts, symbols, conjuncts=conjuncts)
+
+    def __getnewargs__(self):
+        return self.conjuncts
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -114,35 +206,57 @@ class And(Sentence):
         return f"And({conjunctions})"
 
     def add(self, conjunct):
-        Sentence.validate(conjunct)
-        self.conjuncts.append(conjunct)
+        """Returns the conjunction of this sentence's conjuncts and `conjunct`."""
+        return And(*self.conjuncts, conjunct)
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
 
+    def evaluate_partial(self, model):
+        result = True
+        for conjunct in self.conjuncts:
+            value = conjunct.evaluate_partial(model)
+            if value is False:
+                return False
+            elif value is None:
+                result = None
+        return result
+
+    def expression(self, index):
+        if not self.conjuncts:
+            return "True"
+        return "(" + " and ".join(
+            conjunct.expression(index) for conjunct in self.conjuncts
+        ) + ")"
+
+    def evaluate_columns(self, columns):
+        return functools.reduce(
+            operator.and_,
+            (conjunct.evaluate_columns(columns) for conjunct in self.conjuncts),
+            True
+        )
+
     def formula(self):
         if len(self.conjuncts) == 1:
             return self.conjuncts[0].formula()
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
-
 
 class Or(Sentence):
-    def __init__(self, *disjuncts):
-        for disjunct in disjuncts:
-            Sentence.validate(disjunct)
-        self.disjuncts = list(disjuncts)
 
-    def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+    __slots__ = ("disjuncts",)
 
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
+    def __new__(cls, *disjuncts):
+        for disjunct in disjuncts:
+            Sentence.validate(disjunct)
+        symbols = frozenset().union(
+            *(disjunct._symbols for disjunct in disjuncts)
         )
+        return cls.node(disjuncts, symbols, disjuncts=disjuncts)
+
+    def __getnewargs__(self):
+        return self.disjuncts
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
@@ -151,30 +265,52 @@ class Or(Sentence):
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
+    def evaluate_partial(self, model):
+        result = False
+        for disjunct in self.disjuncts:
+            value = disjunct.evaluate_partial(model)
+            if value is True:
+                return True
+            elif value is None:
+                result = None
+        return result
+
+    def expression(self, index):
+        if not self.disjuncts:
+            return "False"
+        return "(" + " or ".join(
+            disjunct.expression(index) for disjunct in self.disjuncts
+        ) + ")"
+
+    def evaluate_columns(self, columns):
+        return functools.reduce(
+            operator.or_,
+            (disjunct.evaluate_columns(columns) for disjunct in self.disjuncts),
+            False
+        )
+
     def formula(self):
         if len(self.disjuncts) == 1:
             return self.disjuncts[0].formula()
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
-
 
 class Implication(Sentence):
-    def __init__(self, antecedent, consequent):
+
+    __slots__ = ("antecedent", "consequent")
+
+    def __new__(cls, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
-        self.antecedent = antecedent
-        self.consequent = consequent
-
-    def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return cls.node(
+            (antecedent, consequent),
+            antecedent._symbols | consequent._symbols,
+            antecedent=antecedent, consequent=consequent
+        )
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    def __getnewargs__(self):
+        return (self.antecedent, self.consequent)
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
@@ -183,29 +319,46 @@ class Implication(Sentence):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
 
+    def evaluate_partial(self, model):
+        antecedent = self.antecedent.evaluate_partial(model)
+        if antecedent is False:
+            return True
+        consequent = self.consequent.evaluate_partial(model)
+        if consequent is True:
+            return True
+        elif antecedent is None or consequent is None:
+            return None
+        return False
+
+    def expression(self, index):
+        antecedent = self.antecedent.expression(index)
+        consequent = self.consequent.expression(index)
+        return f"(not {antecedent} or {consequent})"
+
+    def evaluate_columns(self, columns):
+        return ((self.antecedent.evaluate_columns(columns) ^ True)
+                | self.consequent.evaluate_columns(columns))
+
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
-
 
 class Biconditional(Sentence):
-    def __init__(self, left, right):
+
+    __slots__ = ("left", "right")
+
+    def __new__(cls, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
-        self.left = left
-        self.right = right
-
-    def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return cls.node(
+            (left, right), left._symbols | right._symbols,
+            left=left, right=right
+        )
 
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    def __getnewargs__(self):
+        return (self.left, self.right)
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
@@ -216,17 +369,192 @@ class Biconditional(Sentence):
                 or (not self.left.evaluate(model)
                     and not self.right.evaluate(model)))
 
+    def evaluate_partial(self, model):
+        left = self.left.evaluate_partial(model)
+        if left is None:
+            return None
+        right = self.right.evaluate_partial(model)
+        if right is None:
+            return None
+        return left == right
+
+    def expression(self, index):
+        left = self.left.expression(index)
+        right = self.right.expression(index)
+        return f"({left} == {right})"
+
+    def evaluate_columns(self, columns):
+        return (self.left.evaluate_columns(columns)
+                == self.right.evaluate_columns(columns))
+
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
 
+@functools.lru_cache(maxsize=256)
+def compile_sentence(sentence, symbols):
+    """
+    Compiles a logical sentence into a function of an integer bitmask `m`,
+    where bit `k` of `m` is the truth value of `symbols[k]`, a tuple.
+    Cached, since compiling dominates the cost of checking small knowledge
+    bases and sentences are immutable, so the same knowledge base checked
+    against several queries is compiled only once.
+
+    Sentences nested too deeply for Python's parser are not compiled: the
+    function returned then evaluates the sentence on the model `m` stands
+    for instead.
+    """
+    index = {symbol: k for k, symbol in enumerate(symbols)}
+    try:
+        return eval(f"lambda m: {sentence.expression(index)}")
+    except (MemoryError, RecursionError, SyntaxError):
+        return lambda m: sentence.evaluate({
+            symbol: bool(m >> k & 1) for k, symbol in enumerate(symbols)
+        })
+
+
+def model_check(knowledge, query, backend="compiled"):
+    """
+    Checks if knowledge base entails query.
+
+    `backend` selects how models are enumerated, from the names in
+    `MODEL_CHECK_BACKENDS`; every backend gives the same result.
+    """
+    try:
+        check = MODEL_CHECK_BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"unknown model_check backend {backend!r}")
+    return check(knowledge, query)
+
+
+def model_check_compiled(knowledge, query):
+    """
+    Checks if knowledge base entails query, by compiling both sentences into
+    flat Python functions once and enumerating models as integer bitmasks.
+    """
 
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
+    # Get all symbols in both knowledge and query
+    symbols = tuple(sorted(set.union(knowledge.symbols(), query.symbols())))
+    knowledge_holds = compile_sentence(knowledge, symbols)
+    query_holds = compile_sentence(query, symbols)
+
+    # In every model where knowledge base is true, query must also be true
+    return all(
+        query_holds(m) for m in range(1 << len(symbols)) if knowledge_holds(m)
+    )
+
+
+def model_check_many(knowledge, queries):
+    """
+    Checks which of several queries the knowledge base entails, enumerating
+    the models of the knowledge base only once.
+
+    Returns a dictionary mapping each query to whether knowledge entails it,
+    and the set of models that satisfy knowledge, each a frozenset of
+    `(symbol, value)` pairs over all symbols in knowledge and queries.
+    """
+    symbols = set(knowledge.symbols())
+    for query in queries:
+        symbols |= query.symbols()
+    symbols = tuple(sorted(symbols))
+    knowledge_holds = compile_sentence(knowledge, symbols)
+    models = [m for m in range(1 << len(symbols)) if knowledge_holds(m)]
+
+    entailments = {}
+    for query in queries:
+        query_holds = compile_sentence(query, symbols)
+        entailments[query] = all(query_holds(m) for m in models)
+
+    satisfying_models = set(
+        frozenset((symbol, bool(m >> k & 1)) for k, symbol in enumerate(symbols))
+        for m in models
+    )
+    return entailments, satisfying_models
+
+
+def model_check_pruned(knowledge, query):
+    """
+    Checks if knowledge base entails query, searching over partial models.
+
+    Sentences are evaluated three-valued on the partial model at every node
+    of the search, so a branch is cut as soon as knowledge becomes false or
+    query becomes true in it, whatever the remaining symbols are. Symbols
+    are assigned most frequently occurring first, since those are the most
+    likely to decide the sentences early.
+    """
+    occurrences = symbol_occurrences(And(knowledge, query))
+    symbols = sorted(occurrences, key=lambda symbol: -occurrences[symbol])
+    model = dict()
+
+    def check_all(depth):
+        """Checks if knowledge base entails query in every completion."""
+        if knowledge.evaluate_partial(model) is False:
+            return True
+        holds_query = query.evaluate_partial(model)
+        if holds_query is True:
+            return True
+
+        # Knowledge holds and query fails in every completion
+        if holds_query is False and knowledge.evaluate_partial(model):
+            return False
+
+        symbol = symbols[depth]
+        entailed = True
+        for value in (True, False):
+            model[symbol] = value
+            if not check_all(depth + 1):
+                entailed = False
+                break
+        del model[symbol]
+        return entailed
+
+    return check_all(0)
+
+
+def symbol_occurrences(sentence):
+    """
+    Returns a Counter of how many times each symbol appears in a sentence.
+    """
+    occurrences = collections.Counter()
+    stack = [sentence]
+    while stack:
+        sentence = stack.pop()
+        if isinstance(sentence, Symbol):
+            occurrences[sentence.name] += 1
+        else:
+            stack.extend(
+                argument for argument in sentence.__getnewargs__()
+                if isinstance(argument, Sentence)
+            )
+    return occurrences
+
+
+def model_check_numpy(knowledge, query):
+    """
+    Checks if knowledge base entails query, evaluating both sentences on
+    chunks of models at once with NumPy arrays. Requires NumPy.
+    """
+    from vectorized import model_check_vectorized
+    return model_check_vectorized(knowledge, query)
+
+
+def model_check_sat(knowledge, query):
+    """
+    Checks if knowledge base entails query by proving knowledge ∧ ¬query
+    unsatisfiable with a CDCL SAT solver, after a Tseitin CNF encoding.
+    Unlike the other backends, it does not enumerate all 2^n models.
+    """
+    from sat import model_check_sat
+    return model_check_sat(knowledge, query)
+
+
+def model_check_enumerate(knowledge, query):
+    """
+    Checks if knowledge base entails query, by recursively building every
+    model as a dictionary and evaluating both sentences on it.
+    """
 
     def check_all(knowledge, query, symbols, model):
         """Checks if knowledge base entails query, given a particular model."""
@@ -261,3 +589,12 @@ def model_check(knowledge, query):
 
     # Check that knowledge entails query
     return check_all(knowledge, query, symbols, dict())
+
+
+MODEL_CHECK_BACKENDS = {
+    "compiled": model_check_compiled,
+    "enumerate": model_check_enumerate,
+    "numpy": model_check_numpy,
+    "pruned": model_check_pruned,
+    "sat": model_check_sat
+}
@@ -1,3 +1,5 @@
+import time
+
 from logic import *
 
 AKnight = Symbol("A is a Knight")
@@ -85,9 +87,13 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
+            start = time.perf_counter()
+            entailments, _ = model_check_many(knowledge, symbols)
+            elapsed = time.perf_counter() - start
             for symbol in symbols:
-                if model_check(knowledge, symbol):
+                if entailments[symbol]:
                     print(f"    {symbol}")
+            print(f"    ({1e3 * elapsed:.2f} ms)")
 
 
 if __name__ == "__main__":
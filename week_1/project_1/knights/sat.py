@@ -0,0 +1,297 @@
+from typing import Dict, List, Optional
+
+from logic import And, Biconditional, Implication, Not, Or, Sentence, Symbol
+
+
+class TseitinEncoder():
+    """
+    Converts logical sentences into an equisatisfiable CNF.
+
+    Every compound subformula gets a fresh variable constrained to be
+    equivalent to it (Tseitin encoding), so the CNF grows linearly with the
+    sentence instead of exponentially. Variables are positive integers and
+    literals are signed variables, as in the DIMACS format; identical
+    subformulas share a single variable.
+    """
+
+    def __init__(self):
+        self.n_variables = 0
+        self.clauses: List[List[int]] = []
+
+        # Maps symbol names to their variables
+        self.variables: Dict[str, int] = {}
+
+        # Maps already encoded subformulas to their literals
+        self.literals: Dict[Sentence, int] = {}
+
+    def new_variable(self):
+        self.n_variables += 1
+        return self.n_variables
+
+    def literal(self, sentence):
+        """
+        Returns a literal that is true exactly when `sentence` is true,
+        adding the clauses that define it.
+        """
+        if isinstance(sentence, Symbol):
+            if sentence.name not in self.variables:
+                self.variables[sentence.name] = self.new_variable()
+            return self.variables[sentence.name]
+        if isinstance(sentence, Not):
+            return -self.literal(sentence.operand)
+        if sentence in self.literals:
+            return self.literals[sentence]
+
+        if isinstance(sentence, And):
+            operands = [self.literal(conjunct) for conjunct in sentence.conjuncts]
+            x = self.new_variable()
+            # x <=> a1 ∧ ... ∧ ak
+            for a in operands:
+                self.clauses.append([-x, a])
+            self.clauses.append([x] + [-a for a in operands])
+        elif isinstance(sentence, Or):
+            operands = [self.literal(disjunct) for disjunct in sentence.disjuncts]
+            x = self.new_variable()
+            # x <=> a1 ∨ ... ∨ ak
+            for a in operands:
+                self.clauses.append([x, -a])
+            self.clauses.append([-x] + operands)
+        elif isinstance(sentence, Implication):
+            a = self.literal(sentence.antecedent)
+            b = self.literal(sentence.consequent)
+            x = self.new_variable()
+            # x <=> ¬a ∨ b
+            self.clauses.extend([[x, a], [x, -b], [-x, -a, b]])
+        elif isinstance(sentence, Biconditional):
+            a = self.literal(sentence.left)
+            b = self.literal(sentence.right)
+            x = self.new_variable()
+            # x <=> (a <=> b)
+            self.clauses.extend(
+                [[-x, -a, b], [-x, a, -b], [x, a, b], [x, -a, -b]]
+            )
+        else:
+            raise TypeError(f"cannot encode {sentence!r}")
+
+        self.literals[sentence] = x
+        return x
+
+
+class Solver():
+    """
+    CDCL SAT solver: DPLL search with unit propagation over two watched
+    literals per clause, first-UIP clause learning with non-chronological
+    backjumping, and activity-based (VSIDS) variable selection.
+    """
+
+    def __init__(self, n_variables, clauses):
+        self.n_variables = n_variables
+        self.clauses: List[List[int]] = []
+
+        # Clauses watching each literal, visited when that literal turns false
+        self.watches: Dict[int, List[int]] = {}
+
+        # Current assignment, indexed by variable
+        self.value: List[Optional[bool]] = [None] * (n_variables + 1)
+        self.level = [0] * (n_variables + 1)
+        self.reason: List[Optional[int]] = [None] * (n_variables + 1)
+
+        # Assigned literals in order, and where each decision level starts
+        self.trail: List[int] = []
+        self.trail_limits: List[int] = []
+        self.propagated = 0
+
+        self.activity = [0.0] * (n_variables + 1)
+        self.activity_increment = 1.0
+
+        self.unsatisfiable = False
+        for clause in clauses:
+            self.add_clause(clause)
+
+    def literal_value(self, literal):
+        value = self.value[abs(literal)]
+        if value is None:
+            return None
+        return value if literal > 0 else not value
+
+    def add_clause(self, clause):
+        """Adds an input clause, assigning it at level 0 if it is a unit."""
+        clause = list(dict.fromkeys(clause))
+        if any(-literal in clause for literal in clause):
+            return
+        if not clause:
+            self.unsatisfiable = True
+        elif len(clause) == 1:
+            value = self.literal_value(clause[0])
+            if value is False:
+                self.unsatisfiable = True
+            elif value is None:
+                self.assign(clause[0], None)
+        else:
+            self.watch(clause)
+
+    def watch(self, clause):
+        """Stores a clause, watching its first two literals."""
+        self.clauses.append(clause)
+        index = len(self.clauses) - 1
+        self.watches.setdefault(clause[0], []).append(index)
+        self.watches.setdefault(clause[1], []).append(index)
+        return index
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.value[variable] = literal > 0
+        self.level[variable] = len(self.trail_limits)
+        self.reason[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns every literal implied by unit clauses. Returns the index of a
+        clause with all its literals false, or None if there is no conflict.
+        """
+        while self.propagated < len(self.trail):
+            false_literal = -self.trail[self.propagated]
+            self.propagated += 1
+            watchers = self.watches.get(false_literal, [])
+            self.watches[false_literal] = []
+            for position, index in enumerate(watchers):
+                clause = self.clauses[index]
+
+                # Keep the false literal in the second watched position
+                if clause[0] == false_literal:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.literal_value(clause[0]) is True:
+                    self.watches[false_literal].append(index)
+                    continue
+
+                # Look for another literal that is not false to watch
+                for k in range(2, len(clause)):
+                    if self.literal_value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches.setdefault(clause[1], []).append(index)
+                        break
+                else:
+                    self.watches[false_literal].append(index)
+                    if self.literal_value(clause[0]) is False:
+                        self.watches[false_literal].extend(watchers[position + 1:])
+                        return index
+                    self.assign(clause[0], index)
+        return None
+
+    def analyze(self, conflict):
+        """
+        Resolves the conflicting clause with the reasons of the literals
+        assigned at the current level, up to the first unique implication
+        point. Returns the learnt clause, with its asserting literal first,
+        and the level to backjump to.
+        """
+        current_level = len(self.trail_limits)
+        learnt = [0]
+        seen = set()
+        pending = 0
+        literal = None
+        position = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for other in clause:
+                variable = abs(other)
+                if other == literal or variable in seen:
+                    continue
+                if self.level[variable] == 0:
+                    continue
+                seen.add(variable)
+                self.bump(variable)
+                if self.level[variable] == current_level:
+                    pending += 1
+                else:
+                    learnt.append(other)
+
+            # Next literal of the current level to resolve on, from the trail
+            while abs(self.trail[position]) not in seen:
+                position -= 1
+            literal = self.trail[position]
+            position -= 1
+            seen.discard(abs(literal))
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.clauses[self.reason[abs(literal)]]
+
+        learnt[0] = -literal
+
+        # Watch the literal of the highest remaining level second
+        backjump_level = 0
+        if len(learnt) > 1:
+            highest = max(
+                range(1, len(learnt)), key=lambda k: self.level[abs(learnt[k])]
+            )
+            learnt[1], learnt[highest] = learnt[highest], learnt[1]
+            backjump_level = self.level[abs(learnt[1])]
+        return learnt, backjump_level
+
+    def backtrack(self, level):
+        """Undoes every assignment made above decision level `level`."""
+        if len(self.trail_limits) <= level:
+            return
+        start = self.trail_limits[level]
+        for literal in self.trail[start:]:
+            self.value[abs(literal)] = None
+            self.reason[abs(literal)] = None
+        del self.trail[start:]
+        del self.trail_limits[level:]
+        self.propagated = start
+
+    def bump(self, variable):
+        self.activity[variable] += self.activity_increment
+        if self.activity[variable] > 1e100:
+            self.activity = [activity * 1e-100 for activity in self.activity]
+            self.activity_increment *= 1e-100
+
+    def decide(self):
+        """Returns the unassigned variable with the highest activity."""
+        best = None
+        for variable in range(1, self.n_variables + 1):
+            if self.value[variable] is None and (
+                best is None or self.activity[variable] > self.activity[best]
+            ):
+                best = variable
+        return best
+
+    def solve(self):
+        """
+        Returns True if the clauses are satisfiable, leaving a satisfying
+        assignment in `self.value`, and False otherwise.
+        """
+        if self.unsatisfiable:
+            return False
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                if not self.trail_limits:
+                    return False
+                learnt, backjump_level = self.analyze(conflict)
+                self.backtrack(backjump_level)
+                if len(learnt) == 1:
+                    self.assign(learnt[0], None)
+                else:
+                    self.assign(learnt[0], self.watch(learnt))
+                self.activity_increment /= 0.95
+            else:
+                variable = self.decide()
+                if variable is None:
+                    return True
+                self.trail_limits.append(len(self.trail))
+                self.assign(-variable, None)
+
+
+def model_check_sat(knowledge, query):
+    """
+    Checks if knowledge base entails query, i.e. if knowledge ∧ ¬query is
+    unsatisfiable.
+    """
+    encoder = TseitinEncoder()
+    knowledge_literal = encoder.literal(knowledge)
+    query_literal = encoder.literal(query)
+    clauses = encoder.clauses + [[knowledge_literal], [-query_literal]]
+    return not Solver(encoder.n_variables, clauses).solve()
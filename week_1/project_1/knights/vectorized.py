@@ -0,0 +1,37 @@
+import numpy as np
+
+# Number of models evaluated at once, bounding memory use to a few arrays of
+# this many booleans per subformula being evaluated
+CHUNK_SIZE = 1 << 16
+
+
+def model_check_vectorized(knowledge, query, chunk_size=CHUNK_SIZE):
+    """
+    Checks if knowledge base entails query.
+
+    Models are numbered 0 .. 2^n - 1, with bit k of a model's number giving
+    the value of the k-th symbol. Models are streamed in chunks of
+    `chunk_size`; within a chunk, every symbol is a boolean column over the
+    chunk's models, and both sentences are evaluated as array operations.
+    """
+    symbols = sorted(set.union(knowledge.symbols(), query.symbols()))
+    n_models = 1 << len(symbols)
+    for start in range(0, n_models, chunk_size):
+        columns = truth_columns(symbols, start, min(start + chunk_size, n_models))
+        holds_knowledge = knowledge.evaluate_columns(columns)
+        holds_query = query.evaluate_columns(columns)
+        if not np.all(~np.asarray(holds_knowledge) | holds_query):
+            return False
+    return True
+
+
+def truth_columns(symbols, start, stop):
+    """
+    Returns a dictionary mapping the k-th symbol to a boolean array with its
+    value in each of the models numbered `start` .. `stop - 1`.
+    """
+    models = np.arange(start, stop, dtype=np.int64)
+    return {
+        symbol: ((models >> k) & 1).astype(bool)
+        for k, symbol in enumerate(symbols)
+    }
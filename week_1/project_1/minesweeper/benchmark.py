@@ -0,0 +1,101 @@
+import sys
+import time
+import tracemalloc
+
+from minesweeper import Minesweeper, MinesweeperAI
+from solvers import LinearSolver
+
+HEIGHT = 16
+WIDTH = 30
+MINES = 99
+GAMES = 20
+
+
+def main():
+    if len(sys.argv) not in (1, 5):
+        sys.exit("Usage: python benchmark.py [height width mines games]")
+    if len(sys.argv) == 5:
+        height, width, mines, games = map(int, sys.argv[1:])
+    else:
+        height, width, mines, games = HEIGHT, WIDTH, MINES, GAMES
+
+    print(f"Board {height}x{width} with {mines} mines, {games} games")
+    solvers = [("Subset rule", lambda: None), ("Linear solver", LinearSolver)]
+    configurations = [
+        (name, solver, flood) for name, solver in solvers
+        for flood in (False, True)
+    ]
+    for name, solver, flood in configurations:
+        moves = 0
+        guesses = 0
+        seconds = 0
+        peak_bytes = 0
+        retained_bytes = 0
+        won = 0
+
+        tracemalloc.start()
+        for seed in range(games):
+            game = Minesweeper(
+                height=height, width=width, mines=mines, seed=seed
+            )
+            ai = MinesweeperAI(height=height, width=width, solver=solver())
+            stats = play(game, ai, flood)
+            moves += stats["moves"]
+            guesses += stats["guesses"]
+            seconds += stats["seconds"]
+            peak_bytes += stats["peak_bytes"]
+            retained_bytes += stats["retained_bytes"]
+            won += stats["won"]
+        tracemalloc.stop()
+
+        print(f"{name}, " + ("flood reveal" if flood else "one cell per move"))
+        print(f"  Games won: {won}/{games}")
+        print(f"  Moves: {moves}")
+        print(f"  Random moves: {guesses}")
+        print(f"  Time per move: {1e6 * seconds / moves:.1f} us")
+        print(f"  Peak bytes allocated per move: {peak_bytes / moves:.0f}")
+        print(f"  Bytes retained per move: {retained_bytes / moves:.0f}")
+
+
+def play(game, ai, flood=False):
+    """
+    Plays a game with `ai` until it wins, loses or runs out of moves. With
+    `flood`, every move reveals all cells connected through cells with no
+    nearby mines and hands them to the AI as a single batch.
+    Returns the number of moves and of random moves, the time spent updating
+    the AI's knowledge, and the bytes allocated at peak and retained by each
+    update.
+    """
+    stats = {
+        "moves": 0, "guesses": 0, "seconds": 0, "peak_bytes": 0,
+        "retained_bytes": 0, "won": False
+    }
+    while True:
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+            stats["guesses"] += move is not None
+        if move is None or game.is_mine(move):
+            break
+        if flood:
+            observations = game.flood_reveal(move, ai.moves_made)
+        else:
+            observations = [(move, game.nearby_mines(move))]
+
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        start = time.perf_counter()
+        ai.add_knowledge_many(observations)
+        stats["seconds"] += time.perf_counter() - start
+        after, peak = tracemalloc.get_traced_memory()
+
+        stats["moves"] += 1
+        stats["peak_bytes"] += peak - before
+        stats["retained_bytes"] += after - before
+
+    stats["won"] = ai.mines == game.mines
+    return stats
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,6 @@
 import itertools
 import random
-from typing import List
-from copy import deepcopy
+from typing import Dict, Tuple
 
 
 class Minesweeper():
@@ -9,13 +8,17 @@ class Minesweeper():
     Minesweeper game representation
     """
 
-    def __init__(self, height=8, width=8, mines=8):
+    def __init__(self, height=8, width=8, mines=8, seed=None):
 
         # Set initial width, height, and number of mines
         self.height = height
         self.width = width
         self.mines = set()
 
+        # Mines are drawn from a private generator so boards can be rebuilt
+        self.seed = seed
+        rng = random.Random(seed)
+
         # Initialize an empty field with no mines
         self.board = []
         for i in range(self.height):
@@ -26,8 +29,8 @@ class Minesweeper():
 
         # Add mines randomly
         while len(self.mines) != mines:
-            i = random.randrange(height)
-            j = random.randrange(width)
+            i = rng.randrange(height)
+            j = rng.randrange(width)
             if not self.board[i][j]:
                 self.mines.add((i, j))
                 self.board[i][j] = True
@@ -35,6 +38,17 @@ class Minesweeper():
         # At first, player has found no mines
         self.mines_found = set()
 
+    @classmethod
+    def from_mines(cls, height, width, mines):
+        """
+        Creates a game with mines at the given cells instead of random ones.
+        """
+        game = cls(height=height, width=width, mines=0)
+        for i, j in mines:
+            game.mines.add((i, j))
+            game.board[i][j] = True
+        return game
+
     def print(self):
         """
         Prints a text-based representation
@@ -79,6 +93,33 @@ class Minesweeper():
 
         return count
 
+    def flood_reveal(self, cell, revealed=()):
+        """
+        Reveals a safe `cell` and, if it has no nearby mines, every cell
+        connected to it through cells with no nearby mines, skipping cells
+        in `revealed`. Returns a list of `(cell, nearby mines)` pairs.
+        """
+        observations = []
+        seen = set(revealed)
+        seen.add(cell)
+        frontier = [cell]
+        while frontier:
+            current = frontier.pop()
+            count = self.nearby_mines(current)
+            observations.append((current, count))
+            if count:
+                continue
+
+            # Neighbors of a cell with no nearby mines are all safe
+            i, j = current
+            for ni in range(max(i - 1, 0), min(i + 2, self.height)):
+                for nj in range(max(j - 1, 0), min(j + 2, self.width)):
+                    if (ni, nj) not in seen:
+                        seen.add((ni, nj))
+                        frontier.append((ni, nj))
+
+        return observations
+
     def won(self):
         """
         Checks if all mines have been flagged.
@@ -137,12 +178,16 @@ class MinesweeperAI():
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, solver=None):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
+        # Optional constraint solver backend (see solvers.py), any object
+        # with a `solve(knowledge)` method returning sets `(safes, mines)`
+        self.solver = solver
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
@@ -150,17 +195,32 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
+        # Cells neither clicked on nor known to be safe or a mine
+        self.unknowns = set(
+            (i, j) for i in range(height) for j in range(width)
+        )
+
         # List of sentences about the game known to be true
         self.knowledge = []
 
+        # Index of live sentences by cell: {cell: {id(sentence): sentence}}
+        self._sentences_by_cell: Dict[Tuple[int, int], Dict[int, Sentence]] = {}
+
+        # Sentences created or changed since they were last inferred from
+        self._changed: Dict[int, Sentence] = {}
+
     def mark_mine(self, cell):
         """
         Marks a cell as a mine, and updates all knowledge
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self.unknowns.discard(cell)
+        sentences = self._sentences_by_cell.pop(cell, None)
+        if sentences:
+            for sentence in sentences.values():
+                sentence.mark_mine(cell)
+            self._changed.update(sentences)
 
     def mark_safe(self, cell):
         """
@@ -168,8 +228,12 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        self.unknowns.discard(cell)
+        sentences = self._sentences_by_cell.pop(cell, None)
+        if sentences:
+            for sentence in sentences.values():
+                sentence.mark_safe(cell)
+            self._changed.update(sentences)
 
     def add_knowledge(self, cell, count):
         """
@@ -186,78 +250,147 @@ class MinesweeperAI():
             5) add any new sentences to the AI's knowledge base
                if they can be inferred from existing knowledge
         """
-        def mark_cells():
-            for sentence in self.knowledge:
-                for mine_cell in sentence.known_mines().copy():
-                    self.mark_mine(mine_cell)
-                for safe_cell in sentence.known_safes().copy():
-                    self.mark_safe(safe_cell)
-        
-        def purge_knowledge():
-            """Deletes all null sentences from knowledge ({} = 0)"""
-            self.knowledge = [
-                sentence for sentence in self.knowledge if sentence != Sentence(set(), 0)
-            ]
-
-        def update_knowledge_once():
-            updated_knowledge: bool = False
-            purge_knowledge()
-            knowledge_copy = deepcopy(self.knowledge)
-            for sentence_1 in knowledge_copy:
-                for sentence_2 in knowledge_copy:
-                    if sentence_1 == sentence_2 or not sentence_2.cells:
-                        continue
-                    elif sentence_1.cells > sentence_2.cells:
-                        new_sentence = Sentence(
-                            sentence_1.cells - sentence_2.cells,
-                            sentence_1.count - sentence_2.count
-                        )
-                        if new_sentence not in self.knowledge:
-                            self.knowledge.append(new_sentence)
-                            updated_knowledge = True
-            return updated_knowledge
-        
-        def print_status():
-            print('Move: ', cell)
-            print('KNOWLEDGE BASE:')
-            for sentence in self.knowledge:
-                print(str(sentence))
-            print('SAFE: ', self.safes)
-            print('MINES: ', self.mines)
-
-        def update_knowledge():
-            # print_status()
-            mark_cells()
-            updated_knowledge = update_knowledge_once()
-            if not updated_knowledge:
-                return
-            else:
-                return update_knowledge()
-        
+        self._observe(cell, count)
+        self._update_knowledge()
+
+    def add_knowledge_many(self, observations):
+        """
+        Adds several `(cell, count)` observations at once, e.g. every cell
+        revealed by a flood reveal, and runs a single inference pass over
+        the whole batch instead of one per cell.
+        """
+        for cell, count in observations:
+            self._observe(cell, count)
+        self._update_knowledge()
+
+    def _observe(self, cell, count):
+        """
+        Marks `cell` as a safe move that has been made and adds the sentence
+        about its neighbors to the knowledge base, without inferring from it.
+        """
         self.moves_made.add(cell)
         self.mark_safe(cell)
 
+        # Only unknown neighbors enter the sentence, known mines lower count
         i, j = cell
-        deltas = (-1, 0, 1)
-        values_i = range(self.height)
-        values_j = range(self.width)
         sentence_cells = set()
-
-        for k in deltas:
-            for l in deltas:
-                ni, nj = new_cell = (i + k, j + l)
-                if not (ni in values_i and nj in values_j):
-                    continue
-                elif new_cell not in (self.safes | self.moves_made):
+        for ni in range(max(i - 1, 0), min(i + 2, self.height)):
+            for nj in range(max(j - 1, 0), min(j + 2, self.width)):
+                new_cell = (ni, nj)
+                if new_cell in self.unknowns:
                     sentence_cells.add(new_cell)
+                elif new_cell in self.mines:
+                    count -= 1
+
+        self._add_sentence(sentence_cells, count)
+
+    def _add_sentence(self, cells, count):
+        """
+        Adds the sentence `cells = count` to the knowledge base, unless it is
+        empty or a sentence about the same cells is already known.
+        """
+        if not cells:
+            return
+        for other in self._sentences_by_cell.get(next(iter(cells)), {}).values():
+            if other.cells == cells:
+                return
+
+        sentence = Sentence(cells, count)
+        self.knowledge.append(sentence)
+        for cell in sentence.cells:
+            self._sentences_by_cell.setdefault(cell, {})[id(sentence)] = sentence
+        self._changed[id(sentence)] = sentence
+
+    def _remove_sentence(self, sentence):
+        """Removes a sentence from the knowledge base and from the index."""
+        for cell in sentence.cells:
+            self._sentences_by_cell[cell].pop(id(sentence), None)
+        sentence.cells.clear()
+        sentence.count = 0
+        for index, other in enumerate(self.knowledge):
+            if other is sentence:
+                del self.knowledge[index]
+                break
+
+    def _update_knowledge(self):
+        """
+        Infers new knowledge until nothing changes anymore.
 
-        self.knowledge.append(Sentence(sentence_cells, count))
+        The subset rule runs first. The solver backend, if any, only runs
+        when the subset rule leaves no safe move to make, since that is the
+        only time a missed deduction forces the AI to guess.
+        """
+        while True:
+            self._apply_subset_rule()
+            if self.solver is None or self.make_safe_move() is not None:
+                return
+            safes, mines = self.solver.solve(self.knowledge)
+            if not safes and not mines:
+                return
+            for cell in safes:
+                self.mark_safe(cell)
+            for cell in mines:
+                self.mark_mine(cell)
+
+    def _apply_subset_rule(self):
+        """
+        Infers from changed sentences until no sentence changes anymore.
 
-        update_knowledge()
+        Only the sentences in `self._changed` are compared against the
+        sentences they share cells with, since every other pair was already
+        compared when one of its sentences last changed.
+        """
+        changed = self._changed
+        while changed:
+            _, sentence = changed.popitem()
+            cells = sentence.cells
+
+            # Null sentences ({} = 0) carry no information
+            if not cells:
+                self._remove_sentence(sentence)
+                continue
+
+            # Marking cells puts the sentence back in `changed` as {} = 0
+            if sentence.count == 0:
+                for cell in list(cells):
+                    self.mark_safe(cell)
+                continue
+            if sentence.count == len(cells):
+                for cell in list(cells):
+                    self.mark_mine(cell)
+                continue
+
+            # Every superset of the sentence contains any one of its cells
+            new_sentences = []
+            duplicate = False
+            for other in self._sentences_by_cell[next(iter(cells))].values():
+                if other is sentence:
+                    continue
+                elif other.cells == cells:
+                    duplicate = True
+                    break
+                elif cells < other.cells:
+                    new_sentences.append(
+                        (other.cells - cells, other.count - sentence.count)
+                    )
+            if duplicate:
+                self._remove_sentence(sentence)
+                continue
+
+            # Every subset of the sentence only contains cells of the sentence
+            compared = {id(sentence)}
+            for cell in cells:
+                for key, other in self._sentences_by_cell[cell].items():
+                    if key in compared:
+                        continue
+                    compared.add(key)
+                    if other.cells < cells:
+                        new_sentences.append(
+                            (cells - other.cells, sentence.count - other.count)
+                        )
 
-        # print('##############################################################')
-        # print('\n\n')
-        # print('##############################################################')
+            for new_cells, new_count in new_sentences:
+                self._add_sentence(new_cells, new_count)
 
     def make_safe_move(self):
         """
@@ -268,8 +401,10 @@ class MinesweeperAI():
         This function may use the knowledge in self.mines, self.safes
         and self.moves_made, but should not modify any of those values.
         """
-        possible_moves = self.safes - self.moves_made
-        return next(iter(possible_moves)) if possible_moves else None
+        for cell in self.safes:
+            if cell not in self.moves_made:
+                return cell
+        return None
 
     def make_random_move(self):
         """
@@ -278,8 +413,7 @@ class MinesweeperAI():
             1) have not already been chosen, and
             2) are not known to be mines
         """
-        all_cells = set(
-            (i, j) for i in range(self.height) for j in range(self.width)
-        )
-        possible_moves = all_cells - (self.mines | self.moves_made)
-        return next(iter(possible_moves)) if possible_moves else None
+        for cell in self.unknowns:
+            if cell not in self.mines and cell not in self.moves_made:
+                return cell
+        return self.make_safe_move()
@@ -0,0 +1,162 @@
+import json
+import sys
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+HEIGHT = 16
+WIDTH = 30
+MINES = 99
+
+
+class ReplayLog():
+    """
+    Writes Minesweeper games to a JSON-lines replay file.
+
+    Each game starts with a "board" record holding the board size, seed and
+    mine positions, followed by one record per event, in order:
+        {"type": "decision", "move": [i, j], "kind": "safe" | "random" | "user"}
+        {"type": "observation", "cells": [[i, j, count], ...]}
+    A decision is a move chosen by the AI, or by the user when playing in the
+    runner; an observation holds every cell revealed by a move, together
+    with its number of nearby mines.
+    """
+
+    def __init__(self, path):
+        self.file = open(path, "a")
+
+    def write(self, record):
+        self.file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self.file.flush()
+
+    def board(self, game):
+        self.write({
+            "type": "board",
+            "height": game.height,
+            "width": game.width,
+            "seed": game.seed,
+            "mines": sorted(game.mines)
+        })
+
+    def decision(self, move, kind):
+        self.write({"type": "decision", "move": move, "kind": kind})
+
+    def observation(self, observations):
+        self.write({
+            "type": "observation",
+            "cells": [[i, j, count] for (i, j), count in observations]
+        })
+
+    def close(self):
+        self.file.close()
+
+
+def main():
+    if len(sys.argv) == 3 and sys.argv[1] == "play":
+        replay(sys.argv[2])
+    elif len(sys.argv) in (4, 7) and sys.argv[1] == "record":
+        seed = int(sys.argv[3])
+        if len(sys.argv) == 7:
+            height, width, mines = map(int, sys.argv[4:])
+        else:
+            height, width, mines = HEIGHT, WIDTH, MINES
+        game = Minesweeper(height=height, width=width, mines=mines, seed=seed)
+        record(game, sys.argv[2])
+    else:
+        sys.exit(
+            "Usage: python replay.py record replay.jsonl seed "
+            "[height width mines]\n"
+            "       python replay.py play replay.jsonl"
+        )
+
+
+def record(game, path, flood=True, solver=None):
+    """
+    Plays `game` with a `MinesweeperAI` and appends it to the replay file at
+    `path`. Returns True if the AI did not hit a mine.
+    """
+    log = ReplayLog(path)
+    log.board(game)
+    ai = MinesweeperAI(height=game.height, width=game.width, solver=solver)
+    while True:
+        move, kind = ai.make_safe_move(), "safe"
+        if move is None:
+            move, kind = ai.make_random_move(), "random"
+        if move is None:
+            break
+        log.decision(move, kind)
+        if game.is_mine(move):
+            break
+        if flood:
+            observations = game.flood_reveal(move, ai.moves_made)
+        else:
+            observations = [(move, game.nearby_mines(move))]
+        log.observation(observations)
+        ai.add_knowledge_many(observations)
+    log.close()
+    return move is None or not game.is_mine(move)
+
+
+def load_replay(path):
+    """
+    Reads a replay file. Returns a list of games, each a tuple of the game
+    rebuilt from its board record and the list of its event records.
+    """
+    games = []
+    with open(path) as f:
+        for line in f:
+            event = json.loads(line)
+            if event["type"] == "board":
+                game = Minesweeper.from_mines(
+                    event["height"], event["width"],
+                    [tuple(cell) for cell in event["mines"]]
+                )
+                game.seed = event["seed"]
+                games.append((game, []))
+            else:
+                games[-1][1].append(event)
+    return games
+
+
+def replay(path, solver=None):
+    """
+    Re-runs every game in the replay file at `path` through a fresh
+    `MinesweeperAI`, printing the time the AI spends on each move and
+    whether its decisions still match the recorded ones.
+    """
+    for number, (game, events) in enumerate(load_replay(path)):
+        print(f"Game {number} ({game.height}x{game.width}, "
+              f"{len(game.mines)} mines, seed {game.seed})")
+        ai = MinesweeperAI(height=game.height, width=game.width, solver=solver)
+
+        # Time per move: choosing it plus learning from what it revealed
+        timings = []
+        for event in events:
+            start = time.perf_counter()
+            if event["type"] == "decision":
+                recorded = tuple(event["move"])
+                chosen = (ai.make_safe_move() if event["kind"] == "safe"
+                          else ai.make_random_move()
+                          if event["kind"] == "random" else recorded)
+                if chosen != recorded:
+                    print(f"  Move {len(timings)}: AI chose {chosen}, "
+                          f"recorded {recorded}")
+                timings.append([recorded, 0])
+            else:
+                ai.add_knowledge_many(
+                    ((i, j), count) for i, j, count in event["cells"]
+                )
+            timings[-1][1] += time.perf_counter() - start
+
+        for move, (cell, seconds) in enumerate(timings):
+            print(f"  Move {move} {cell}: {1e6 * seconds:.1f} us")
+        if timings:
+            total = sum(seconds for _, seconds in timings)
+            slowest = max(range(len(timings)), key=lambda k: timings[k][1])
+            print(f"  Total: {1e3 * total:.2f} ms over {len(timings)} moves, "
+                  f"slowest move {slowest} "
+                  f"({1e6 * timings[slowest][1]:.1f} us)")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,11 +3,20 @@ import sys
 import time
 
 from minesweeper import Minesweeper, MinesweeperAI
+from replay import ReplayLog
 
 HEIGHT = 8
 WIDTH = 8
 MINES = 8
 
+# Reveal every cell connected to a cell with no nearby mines at once
+FLOOD_REVEAL = True
+
+# Seed for board generation (None for a random board) and, optionally, a
+# JSON-lines file where every game is recorded for `python replay.py play`
+SEED = None
+REPLAY_LOG = None
+
 # Colors
 BLACK = (0, 0, 0)
 GRAY = (180, 180, 180)
@@ -38,8 +47,11 @@ mine = pygame.image.load("assets/images/mine.png")
 mine = pygame.transform.scale(mine, (cell_size, cell_size))
 
 # Create game and AI agent
-game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
+game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES, seed=SEED)
 ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+log = ReplayLog(REPLAY_LOG) if REPLAY_LOG else None
+if log:
+    log.board(game)
 
 # Keep track of revealed cells, flagged cells, and if a mine was hit
 revealed = set()
@@ -188,14 +200,22 @@ while True:
                     print("No moves left to make.")
                 else:
                     print("No known safe moves, AI making random move.")
+                    if log:
+                        log.decision(move, "random")
             else:
                 print("AI making safe move.")
+                if log:
+                    log.decision(move, "safe")
             time.sleep(0.2)
 
         # Reset game state
         elif resetButton.collidepoint(mouse):
-            game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
+            game = Minesweeper(
+                height=HEIGHT, width=WIDTH, mines=MINES, seed=SEED
+            )
             ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
+            if log:
+                log.board(game)
             revealed = set()
             flags = set()
             lost = False
@@ -209,14 +229,24 @@ while True:
                             and (i, j) not in flags
                             and (i, j) not in revealed):
                         move = (i, j)
+                        if log:
+                            log.decision(move, "user")
 
     # Make move and update AI knowledge
     if move:
         if game.is_mine(move):
             lost = True
+        elif FLOOD_REVEAL:
+            observations = game.flood_reveal(move, revealed)
+            revealed.update(cell for cell, _ in observations)
+            ai.add_knowledge_many(observations)
+            if log:
+                log.observation(observations)
         else:
             nearby = game.nearby_mines(move)
             revealed.add(move)
             ai.add_knowledge(move, nearby)
+            if log:
+                log.observation([(move, nearby)])
 
     pygame.display.flip()
@@ -0,0 +1,206 @@
+from fractions import Fraction
+from typing import Dict, List, Set, Tuple
+
+
+class BudgetExceeded(Exception):
+    """Raised when a backtracking search visits too many nodes."""
+
+
+class NothingForced(Exception):
+    """Raised when every variable has taken both values in some solution."""
+
+
+class LinearSolver():
+    """
+    Constraint solver backend for `MinesweeperAI`.
+
+    Every sentence `{c1, c2, ..., ck} = count` is read as the linear equation
+    x1 + x2 + ... + xk = count over variables in {0, 1}, where xi = 1 means
+    that cell ci is a mine. Deductions that need three or more sentences
+    combined, which the pairwise subset rule misses, are found by:
+        1) Gaussian elimination over the sentence matrix, which forces the
+           variables of any reduced row whose right hand side equals its
+           smallest or largest possible value, and
+        2) a backtracking fallback that enumerates every solution of each
+           connected component of the frontier, and forces each variable
+           that takes the same value in all of them.
+    """
+
+    def __init__(self, max_nodes=100000):
+
+        # Backtracking gives up on a component after visiting this many nodes
+        self.max_nodes = max_nodes
+
+    def solve(self, knowledge) -> Tuple[Set, Set]:
+        """
+        Returns the sets of cells known to be safe and known to be mines
+        given the sentences in `knowledge`.
+        """
+        safes = set()
+        mines = set()
+        for cells, constraints in self.components(knowledge):
+            forced = self.eliminate(len(cells), constraints)
+            forced.update(self.backtrack(len(cells), constraints, forced))
+            for variable, value in forced.items():
+                (mines if value else safes).add(cells[variable])
+        return safes, mines
+
+    def components(self, knowledge):
+        """
+        Splits the sentences in `knowledge` into groups that share no cells.
+        Yields, for each group, the list of its cells and its constraints as
+        `(variables, count)` pairs, variables being indices into the list.
+        """
+        sentences = [sentence for sentence in knowledge if sentence.cells]
+
+        # Union-find over sentences, joined through the cells they share
+        parent = list(range(len(sentences)))
+
+        def find(k):
+            while parent[k] != k:
+                parent[k] = parent[parent[k]]
+                k = parent[k]
+            return k
+
+        owner: Dict[Tuple[int, int], int] = {}
+        for k, sentence in enumerate(sentences):
+            for cell in sentence.cells:
+                if cell in owner:
+                    parent[find(k)] = find(owner[cell])
+                else:
+                    owner[cell] = k
+
+        groups: Dict[int, List] = {}
+        for k, sentence in enumerate(sentences):
+            groups.setdefault(find(k), []).append(sentence)
+
+        for group in groups.values():
+            cells = sorted(set().union(*(sentence.cells for sentence in group)))
+            index = {cell: variable for variable, cell in enumerate(cells)}
+            constraints = [
+                (sorted(index[cell] for cell in sentence.cells), sentence.count)
+                for sentence in group
+            ]
+            yield cells, constraints
+
+    def eliminate(self, n, constraints) -> Dict[int, int]:
+        """
+        Row-reduces the system of `constraints` over `n` variables and
+        returns the variables forced by some reduced row, as {variable: value}.
+        """
+        rows = []
+        for variables, count in constraints:
+            row = [Fraction(0)] * (n + 1)
+            for variable in variables:
+                row[variable] = Fraction(1)
+            row[n] = Fraction(count)
+            rows.append(row)
+
+        # Reduced row echelon form
+        pivot_row = 0
+        for column in range(n):
+            pivot = next(
+                (r for r in range(pivot_row, len(rows)) if rows[r][column]),
+                None
+            )
+            if pivot is None:
+                continue
+            rows[pivot_row], rows[pivot] = rows[pivot], rows[pivot_row]
+            pivot_value = rows[pivot_row][column]
+            rows[pivot_row] = [value / pivot_value for value in rows[pivot_row]]
+            for r, row in enumerate(rows):
+                if r != pivot_row and row[column]:
+                    factor = row[column]
+                    rows[r] = [
+                        value - factor * pivot_value
+                        for value, pivot_value in zip(row, rows[pivot_row])
+                    ]
+            pivot_row += 1
+            if pivot_row == len(rows):
+                break
+
+        # A row sum(a_i * x_i) = b with x_i in {0, 1} lies between the sum of
+        # its negative and the sum of its positive coefficients. If b is one
+        # of those bounds, every variable in the row is forced.
+        forced = {}
+        for row in rows:
+            total = row[n]
+            positive = sum(value for value in row[:n] if value > 0)
+            negative = sum(value for value in row[:n] if value < 0)
+            if positive == negative:
+                continue
+            if total == positive:
+                forced.update(
+                    (variable, int(value > 0))
+                    for variable, value in enumerate(row[:n]) if value
+                )
+            elif total == negative:
+                forced.update(
+                    (variable, int(value < 0))
+                    for variable, value in enumerate(row[:n]) if value
+                )
+        return forced
+
+    def backtrack(self, n, constraints, forced) -> Dict[int, int]:
+        """
+        Enumerates every assignment of the `n` variables that satisfies
+        `constraints` and agrees with `forced`, and returns the variables
+        that take the same value in all of them, as {variable: value}.
+        Returns nothing if the search exceeds its node budget or finds no
+        solution.
+        """
+        counts = [count for _, count in constraints]
+        sums = [0] * len(constraints)
+        remaining = [len(variables) for variables, _ in constraints]
+        variable_constraints = [[] for _ in range(n)]
+        for k, (variables, _) in enumerate(constraints):
+            for variable in variables:
+                variable_constraints[variable].append(k)
+
+        # Visit variables constraint by constraint so that they are pruned
+        # as early as possible, with forced variables first
+        order = list(forced)
+        for variables, _ in constraints:
+            order.extend(v for v in variables if v not in order)
+
+        assignment = [0] * n
+        seen = [[False, False] for _ in range(n)]
+        nodes = 0
+
+        def search(depth):
+            nonlocal nodes
+            if depth == n:
+                for variable in range(n):
+                    seen[variable][assignment[variable]] = True
+                if all(values[0] and values[1] for values in seen):
+                    raise NothingForced
+                return
+            variable = order[depth]
+            values = (forced[variable],) if variable in forced else (0, 1)
+            for value in values:
+                nodes += 1
+                if nodes > self.max_nodes:
+                    raise BudgetExceeded
+                consistent = True
+                for k in variable_constraints[variable]:
+                    sums[k] += value
+                    remaining[k] -= 1
+                    if sums[k] > counts[k] or sums[k] + remaining[k] < counts[k]:
+                        consistent = False
+                if consistent:
+                    assignment[variable] = value
+                    search(depth + 1)
+                for k in variable_constraints[variable]:
+                    sums[k] -= value
+                    remaining[k] += 1
+
+        try:
+            search(0)
+        except (BudgetExceeded, NothingForced):
+            return {}
+
+        return {
+            variable: int(seen[variable][1])
+            for variable in range(n)
+            if seen[variable][0] != seen[variable][1]
+        }
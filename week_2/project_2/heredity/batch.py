@@ -0,0 +1,182 @@
+import argparse
+import csv
+import glob
+import json
+import multiprocessing
+import os
+import time
+
+from heredity import ENGINES, load_data
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python batch.py (directory|glob) [--engine E] "
+              "[--output results.jsonl|results.csv] [--processes P]"
+    )
+    parser.add_argument("families", help="directory or glob of family CSVs")
+    parser.add_argument("--engine", default="exact", choices=list(ENGINES))
+    parser.add_argument("--output", default="results.jsonl")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+
+    if os.path.isdir(args.families):
+        paths = sorted(glob.glob(os.path.join(args.families, "*.csv")))
+    else:
+        paths = sorted(glob.glob(args.families))
+
+    results = run_batch(paths, args.engine, args.processes)
+    if args.output.endswith(".csv"):
+        write_table(results, args.output)
+    else:
+        write_json_lines(results, args.output)
+
+    computed = sum(result["duplicate_of"] is None for result in results)
+    seconds = sum(result["seconds"] for result in results)
+    print(f"{len(results)} families, {computed} computed, "
+          f"{seconds:.3f} s of inference")
+
+
+def run_batch(paths, engine="exact", processes=None):
+    """
+    Runs `engine` on every family CSV in `paths`, in a pool of `processes`
+    processes. Families whose structure and evidence match an earlier one
+    up to renaming people are not computed again: their results are copied
+    from that family, person by person.
+
+    Returns one record per family with its path, the engine, the time its
+    inference took, the path of the family it duplicates (or None), and its
+    probabilities.
+    """
+    families = [load_data(path) for path in paths]
+    signatures = [canonical_form(people) for people in families]
+
+    # First family with each signature
+    representatives = {}
+    for k, (signature, _) in enumerate(signatures):
+        representatives.setdefault(signature, k)
+    unique = sorted(representatives.values())
+
+    arguments = [(families[k], engine) for k in unique]
+    with multiprocessing.Pool(processes) as pool:
+        computed = dict(zip(unique, pool.starmap(infer_family, arguments)))
+
+    results = []
+    for k, path in enumerate(paths):
+        signature, order = signatures[k]
+        representative = representatives[signature]
+        probabilities, seconds = computed[representative]
+        if representative != k:
+
+            # People in the same canonical position play the same role
+            source_order = signatures[representative][1]
+            probabilities = {
+                person: probabilities[source]
+                for person, source in zip(order, source_order)
+            }
+            seconds = 0
+        results.append({
+            "family": path,
+            "engine": engine,
+            "seconds": seconds,
+            "duplicate_of": None if representative == k else paths[representative],
+            "probabilities": probabilities
+        })
+    return results
+
+
+def infer_family(people, engine):
+    """Runs `engine` on a family, returning its results and elapsed time."""
+    start = time.perf_counter()
+    probabilities = ENGINES[engine](people)
+    return probabilities, time.perf_counter() - start
+
+
+def canonical_form(people):
+    """
+    Returns a signature of a family's structure and evidence that does not
+    depend on people's names, and the order of people it is written in.
+
+    People are ordered by color refinement: each person starts colored by
+    their trait and whether they have parents, and is then repeatedly
+    recolored by their color, their parents' colors and the multiset of
+    their children's colors, until colors stop splitting. Colors are ranks
+    among the family's sorted descriptions, so that families equal up to
+    renaming get the same colors. Ties left are broken by name, so such
+    families may occasionally get different signatures, but families with
+    the same signature always match person by person.
+    """
+    children = {person: [] for person in people}
+    for person, data in people.items():
+        for role, parent in (("mother", data["mother"]), ("father", data["father"])):
+            if parent:
+                children[parent].append((role, person))
+
+    colors = {
+        person: (data["mother"] is not None, data["trait"])
+        for person, data in people.items()
+    }
+    colors = ranks(colors)
+    while True:
+        descriptions = {
+            person: (
+                colors[person],
+                colors.get(data["mother"]), colors.get(data["father"]),
+                tuple(sorted((role, colors[child]) for role, child in children[person]))
+            )
+            for person, data in people.items()
+        }
+        refined = ranks(descriptions)
+        if len(set(refined.values())) == len(set(colors.values())):
+            break
+        colors = refined
+
+    order = sorted(people, key=lambda person: (colors[person], person))
+    position = {person: k for k, person in enumerate(order)}
+    signature = tuple(
+        (position.get(people[person]["mother"]),
+         position.get(people[person]["father"]),
+         people[person]["trait"])
+        for person in order
+    )
+    return signature, order
+
+
+def ranks(values):
+    """Replaces each value of a dictionary by its rank among the values."""
+    distinct = sorted(set(values.values()), key=repr)
+    rank = {value: k for k, value in enumerate(distinct)}
+    return {key: rank[value] for key, value in values.items()}
+
+
+def write_json_lines(results, path):
+    """Writes one JSON record per family."""
+    with open(path, "w") as f:
+        for result in results:
+            f.write(json.dumps(result) + "\n")
+
+
+def write_table(results, path):
+    """
+    Writes results as a tidy table, one row per family, person, field and
+    value, as a CSV file ready to load into a data frame or Parquet file.
+    """
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow([
+            "family", "engine", "seconds", "duplicate_of",
+            "person", "field", "value", "probability"
+        ])
+        for result in results:
+            for person, distributions in result["probabilities"].items():
+                for field, distribution in distributions.items():
+                    for value, p in distribution.items():
+                        writer.writerow([
+                            result["family"], result["engine"],
+                            result["seconds"], result["duplicate_of"] or "",
+                            person, field, value, p
+                        ])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+import heapq
+import itertools
+from typing import Dict, List, Tuple
+
+from heredity import GENES, Model, empty_probabilities
+
+
+class Factor():
+    """
+    Non-negative function of the number of genes of some people.
+
+    `table` holds one value per assignment of `variables`, in the order of
+    `itertools.product(GENES, repeat=len(variables))`.
+    """
+
+    def __init__(self, variables: Tuple[str, ...], table: List[float]):
+        self.variables = variables
+        self.table = table
+
+    def __repr__(self):
+        return f"Factor({self.variables}, {self.table})"
+
+    def multiply(self, other):
+        """Returns the product of two factors, over all of their variables."""
+        variables = self.variables + tuple(
+            variable for variable in other.variables
+            if variable not in self.variables
+        )
+        own = [variables.index(variable) for variable in self.variables]
+        others = [variables.index(variable) for variable in other.variables]
+        table = []
+        for assignment in itertools.product(GENES, repeat=len(variables)):
+            table.append(
+                self.table[index(assignment[k] for k in own)]
+                * other.table[index(assignment[k] for k in others)]
+            )
+        return Factor(variables, table)
+
+    def sum_out(self, variables):
+        """Returns the factor with `variables` summed out."""
+        kept = tuple(v for v in self.variables if v not in variables)
+        positions = [self.variables.index(variable) for variable in kept]
+        table = [0.0] * len(GENES) ** len(kept)
+        for assignment, value in zip(
+            itertools.product(GENES, repeat=len(self.variables)), self.table
+        ):
+            table[index(assignment[k] for k in positions)] += value
+        return Factor(kept, table)
+
+    def normalized(self):
+        """
+        Returns the factor scaled to sum to 1. Messages are normalized since
+        only their proportions matter, and unnormalized ones underflow to 0
+        in large families.
+        """
+        total = sum(self.table)
+        return Factor(self.variables, [value / total for value in self.table])
+
+    def distribution(self):
+        """Returns the normalized distribution of a single variable factor."""
+        total = sum(self.table)
+        return {genes: value / total for genes, value in zip(GENES, self.table)}
+
+
+def index(assignment):
+    """Returns the position of an assignment in a factor's table."""
+    position = 0
+    for genes in assignment:
+        position = position * len(GENES) + genes
+    return position
+
+
+def product(factors):
+    """
+    Returns the product of `factors`, or a factor constantly equal to 1 over
+    no variables if there are none.
+    """
+    result = Factor((), [1.0])
+    for factor in factors:
+        result = result.multiply(factor)
+    return result
+
+
+def family_factors(people, probs) -> List[Factor]:
+    """
+    Returns the factors of the family's Bayesian network with the trait
+    evidence absorbed: one factor per person over their genes and their
+    parents' genes, holding the probability of their genes given their
+    parents' genes times the probability of their observed trait, if any.
+    """
+    model = Model(probs)
+    return [person_factor(people, person, model) for person in people]
+
+
+def person_factor(people, person, model) -> Factor:
+    """Returns the factor of one person, as `family_factors` builds it."""
+    data = people[person]
+    likelihood = model.evidence(data["trait"])
+    mother, father = data["mother"], data["father"]
+    if mother and father:
+        table = [
+            model.inherit[genes][mother_genes][father_genes]
+            * likelihood[genes]
+            for genes, mother_genes, father_genes
+            in itertools.product(GENES, repeat=3)
+        ]
+        return Factor((person, mother, father), table)
+    table = [model.prior[genes] * likelihood[genes] for genes in GENES]
+    return Factor((person,), table)
+
+
+def elimination_order(factors) -> List[str]:
+    """
+    Returns an order in which to eliminate every variable, greedily picking
+    the variable with the fewest neighbors in the interaction graph.
+    """
+    neighbors: Dict[str, set] = {}
+    for factor in factors:
+        for variable in factor.variables:
+            neighbors.setdefault(variable, set()).update(factor.variables)
+    for variable in neighbors:
+        neighbors[variable].discard(variable)
+
+    # Heap of (degree, variable), with stale entries skipped when popped
+    heap = [(len(adjacent), variable) for variable, adjacent in neighbors.items()]
+    heapq.heapify(heap)
+    order = []
+    while heap:
+        degree, variable = heapq.heappop(heap)
+        if variable not in neighbors or degree != len(neighbors[variable]):
+            continue
+        adjacent = neighbors.pop(variable)
+
+        # Eliminating a variable connects all of its neighbors
+        for neighbor in adjacent:
+            neighbors[neighbor] |= adjacent
+            neighbors[neighbor].discard(neighbor)
+            neighbors[neighbor].discard(variable)
+            heapq.heappush(heap, (len(neighbors[neighbor]), neighbor))
+        order.append(variable)
+    return order
+
+
+class JunctionTree():
+    """
+    Clique tree of a set of factors, built by variable elimination.
+
+    Eliminating a variable creates a clique over the variables of every
+    factor that mentions it; its message (the product summed over the
+    variable) goes to the clique that later consumes it, its parent. Cliques
+    are calibrated with one upward and one downward pass of messages
+    (Shafer-Shenoy), after which every variable's marginal can be read off
+    the clique where it was eliminated.
+    """
+
+    def __init__(self, factors, order=None):
+        order = order if order is not None else elimination_order(factors)
+
+        # Each clique eliminates one variable
+        self.variables: List[str] = []
+        self.scopes: List[Tuple[str, ...]] = []
+        self.factors: List[List[Factor]] = []
+        self.potentials: List[Factor] = []
+        self.parents: List = []
+        self.children: List[List[int]] = []
+
+        # Factors not consumed yet: (variables, original factor or clique),
+        # and the keys of those that mention each variable
+        pool = {}
+        mentions: Dict[str, set] = {}
+        keys = itertools.count()
+
+        def add_to_pool(variables, source):
+            key = next(keys)
+            pool[key] = (variables, source)
+            for variable in variables:
+                mentions.setdefault(variable, set()).add(key)
+
+        for factor in factors:
+            add_to_pool(set(factor.variables), factor)
+
+        for variable in order:
+            consumed = []
+            for key in mentions.pop(variable, ()):
+                variables, source = pool.pop(key)
+                for other in variables - {variable}:
+                    mentions[other].discard(key)
+                consumed.append((variables, source))
+            clique = len(self.variables)
+            scope = set().union(*(variables for variables, _ in consumed))
+
+            self.variables.append(variable)
+            self.scopes.append(tuple(scope))
+            self.factors.append([
+                source for _, source in consumed if isinstance(source, Factor)
+            ])
+            self.potentials.append(product(self.factors[clique]))
+            self.parents.append(None)
+            self.children.append([
+                source for _, source in consumed if isinstance(source, int)
+            ])
+            for child in self.children[clique]:
+                self.parents[child] = clique
+            if len(scope) > 1:
+                add_to_pool(scope - {variable}, clique)
+
+        self.calibrate()
+
+    def calibrate(self):
+        """Computes the upward and downward messages of every clique."""
+        n = len(self.variables)
+
+        # Cliques are created after all of their children
+        self.upward: List[Factor] = [None] * n
+        for clique in range(n):
+            self.upward[clique] = product(
+                [self.potentials[clique]]
+                + [self.upward[child] for child in self.children[clique]]
+            ).sum_out({self.variables[clique]}).normalized()
+
+        self.downward: List[Factor] = [None] * n
+        for clique in reversed(range(n)):
+            parent = self.parents[clique]
+            if parent is None:
+                continue
+            incoming = self.incoming(parent, exclude=clique)
+            separator = set(self.scopes[clique]) - {self.variables[clique]}
+            self.downward[clique] = product(
+                [self.potentials[parent]] + incoming
+            ).sum_out(set(self.scopes[parent]) - separator).normalized()
+
+    def incoming(self, clique, exclude=None):
+        """Returns the messages a clique receives, except from `exclude`."""
+        messages = [
+            self.upward[child] for child in self.children[clique]
+            if child != exclude
+        ]
+        if self.downward[clique] is not None:
+            messages.append(self.downward[clique])
+        return messages
+
+    def marginals(self) -> Dict[str, Dict[int, float]]:
+        """Returns the distribution of the genes of every person."""
+        marginals = {}
+        for clique, variable in enumerate(self.variables):
+            belief = product([self.potentials[clique]] + self.incoming(clique))
+            marginals[variable] = belief.sum_out(
+                set(belief.variables) - {variable}
+            ).distribution()
+        return marginals
+
+
+def junction_tree_probabilities(people, probs):
+    """
+    Return gene and trait distributions for each person, in the structure
+    `normalize` produces, computed exactly with a junction tree.
+    """
+    marginals = JunctionTree(family_factors(people, probs)).marginals()
+    model = Model(probs)
+    probabilities = empty_probabilities(people)
+    for person, data in people.items():
+        probabilities[person]["gene"].update(marginals[person])
+
+        # A trait only depends on its own person's genes
+        if data["trait"] is None:
+            p_trait = sum(
+                marginals[person][genes] * model.trait[genes][True]
+                for genes in GENES
+            )
+        else:
+            p_trait = float(data["trait"])
+        probabilities[person]["trait"].update({True: p_trait, False: 1 - p_trait})
+    return probabilities
@@ -1,6 +1,7 @@
+import argparse
 import csv
 import itertools
-import sys
+import math
 from typing import Any, Dict, Set
 
 
@@ -38,16 +39,280 @@ PROBS = {
     "mutation": 0.01
 }
 
+# Possible number of copies of the gene a person has
+GENES = (0, 1, 2)
+
+
+class Model():
+    """
+    Probabilities of `PROBS`-like dictionaries, turned once into tables
+    indexed by numbers of genes, along with their logarithms:
+
+        inherit[genes][mother_genes][father_genes]
+        prior[genes]
+        trait[genes][trait]
+
+    where `trait` is a bool (or 0 for False, 1 for True). Engines read these
+    tables in their inner loops instead of the nested `PROBS` dictionary.
+    """
+
+    def __init__(self, probs=PROBS):
+        self.inherit = [
+            [
+                [
+                    inherit_n_genes_prob(
+                        genes, father_genes, mother_genes, probs["mutation"]
+                    )
+                    for father_genes in GENES
+                ]
+                for mother_genes in GENES
+            ]
+            for genes in GENES
+        ]
+        self.prior = [probs["gene"][genes] for genes in GENES]
+        self.trait = [
+            [probs["trait"][genes][False], probs["trait"][genes][True]]
+            for genes in GENES
+        ]
+
+        self.log_inherit = [
+            [[log(p) for p in row] for row in table] for table in self.inherit
+        ]
+        self.log_prior = [log(p) for p in self.prior]
+        self.log_trait = [[log(p) for p in row] for row in self.trait]
+
+    def evidence(self, trait):
+        """
+        Returns the probability of an observed `trait` given each number of
+        genes, or 1 for every number of genes if the trait is unknown.
+        """
+        if trait is None:
+            return [1] * len(GENES)
+        return [self.trait[genes][trait] for genes in GENES]
+
+    def scorer(self, people):
+        """
+        Returns a function scoring gene assignments of a family in log space:
+        `score(genes, have_trait=None)` is the log joint probability that
+        every person has `genes[person]` copies of the gene and, if
+        `have_trait` is given, that exactly the people in `have_trait` have
+        the trait. Without `have_trait`, only the traits observed in `people`
+        are scored, which is the joint probability summed over every unknown
+        trait.
+        """
+        log_inherit, log_prior = self.log_inherit, self.log_prior
+        log_trait = self.log_trait
+        family = [
+            (person, data["mother"], data["father"], data["trait"])
+            for person, data in people.items()
+        ]
+
+        def score(genes, have_trait=None):
+            log_p = 0.0
+            for person, mother, father, trait in family:
+                n = genes[person]
+                if mother and father:
+                    log_p += log_inherit[n][genes[mother]][genes[father]]
+                else:
+                    log_p += log_prior[n]
+                if have_trait is not None:
+                    trait = person in have_trait
+                if trait is not None:
+                    log_p += log_trait[n][trait]
+            return log_p
+
+        return score
+
+
+def log(p):
+    """Natural logarithm of a probability, -inf for 0."""
+    return math.log(p) if p > 0 else -math.inf
+
 
 def main():
 
     # Check for proper usage
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python heredity.py data.csv")
-    people = load_data(sys.argv[1])
+    parser = argparse.ArgumentParser(
+        usage="python heredity.py data.csv [engine] [--samples N] "
+              "[--seed S] [--chains C] [--processes P]"
+    )
+    parser.add_argument("data")
+    parser.add_argument(
+        "engine", nargs="?", default="exact", choices=list(ENGINES)
+    )
+    parser.add_argument("--samples", type=int, default=None,
+                        help="samples per chain, for sampling engines")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--chains", type=int, default=1)
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+    people = load_data(args.data)
+
+    # Gene and trait probabilities for each person
+    if args.engine in ("gibbs", "likelihood"):
+        from sampling import SAMPLES, sample_probabilities
+        probabilities, diagnostics = sample_probabilities(
+            people, PROBS, args.engine, samples=args.samples or SAMPLES,
+            seed=args.seed, chains=args.chains, processes=args.processes
+        )
+    else:
+        probabilities = ENGINES[args.engine](people)
+
+    # Print results
+    print_probabilities(people, probabilities)
+
+    if args.engine in ("gibbs", "likelihood"):
+        print("Diagnostics:")
+        for name, value in diagnostics.items():
+            print(f"  {name}: {value}")
+
+
+def print_probabilities(people, probabilities):
+    """
+    Print gene and trait distributions for each person.
+    """
+    for person in people:
+        print(f"{person}:")
+        for field in probabilities[person]:
+            print(f"  {field.capitalize()}:")
+            for value in probabilities[person][field]:
+                p = probabilities[person][field][value]
+                print(f"    {value}: {p:.4f}")
+
+
+def enumerate_probabilities(people):
+    """
+    Compute gene and trait distributions for each person by summing the
+    joint probability of every possible assignment of genes and traits.
+
+    Gene assignments are streamed depth-first, parents before children, so
+    that each partial product is shared by every assignment extending it
+    and each person's sum is read off the subtree below their choice. Only
+    observed traits enter the joint probability: summed over the unknown
+    traits, it is the same for every completion, and each unknown trait's
+    own distribution follows from its person's genes.
+    """
+    probabilities = empty_probabilities(people)
+    order = topological_order(people)
+    model = Model(PROBS)
+    inherit, prior, p_trait = model.inherit, model.prior, model.trait
+
+    # Probability of each person's observed trait given their genes
+    evidence = {
+        person: model.evidence(people[person]["trait"]) for person in people
+    }
+
+    assignment = {}
+
+    def visit(depth, weight):
+        """
+        Adds to `probabilities` the weight of every assignment extending the
+        current one, and returns their total weight.
+        """
+        if depth == len(order):
+            return weight
+        person = order[depth]
+        mother, father = people[person]["mother"], people[person]["father"]
+        total = 0
+        for genes in GENES:
+            if mother and father:
+                p = inherit[genes][assignment[mother]][assignment[father]]
+            else:
+                p = prior[genes]
+            assignment[person] = genes
+            subtotal = visit(depth + 1, weight * p * evidence[person][genes])
+            total += subtotal
+
+            probabilities[person]["gene"][genes] += subtotal
+            trait = people[person]["trait"]
+            if trait is None:
+                for value in (True, False):
+                    probabilities[person]["trait"][value] += (
+                        subtotal * p_trait[genes][value]
+                    )
+            else:
+                probabilities[person]["trait"][trait] += subtotal
+        del assignment[person]
+        return total
+
+    visit(0, 1)
+
+    # Ensure probabilities sum to 1
+    normalize(probabilities)
+    return probabilities
+
+
+def topological_order(people):
+    """
+    Return the names of all people, with parents before their children.
+    """
+    order = []
+    visited = set()
+
+    def visit(person):
+        if person in visited:
+            return
+        visited.add(person)
+        for parent in (people[person]["mother"], people[person]["father"]):
+            if parent:
+                visit(parent)
+        order.append(person)
+
+    for person in people:
+        visit(person)
+    return order
+
+
+def exact_probabilities(people):
+    """
+    Compute gene and trait distributions for each person by exact inference
+    on the family's Bayesian network (see elimination.py), in time roughly
+    linear in the size of the family.
+    """
+    from elimination import junction_tree_probabilities
+    return junction_tree_probabilities(people, PROBS)
+
 
-    # Keep track of gene and trait probabilities for each person
-    probabilities = {
+def numpy_probabilities(people):
+    """
+    Compute gene and trait distributions for each person by scoring every
+    gene assignment at once, in log space, with NumPy arrays (see
+    vectorized.py). Requires NumPy.
+    """
+    from vectorized import vectorized_probabilities
+    return vectorized_probabilities(people, PROBS)
+
+
+def gibbs_probabilities(people, **options):
+    """
+    Estimate gene and trait distributions for each person with Gibbs
+    sampling over gene variables (see sampling.py), for pedigrees too large
+    or too inbred for exact inference. `options` are passed on to
+    `sampling.sample_probabilities`.
+    """
+    from sampling import sample_probabilities
+    probabilities, _ = sample_probabilities(people, PROBS, "gibbs", **options)
+    return probabilities
+
+
+def likelihood_probabilities(people, **options):
+    """
+    Estimate gene and trait distributions for each person with likelihood
+    weighting (see sampling.py). `options` are passed on to
+    `sampling.sample_probabilities`.
+    """
+    from sampling import sample_probabilities
+    probabilities, _ = sample_probabilities(
+        people, PROBS, "likelihood", **options
+    )
+    return probabilities
+
+
+def empty_probabilities(people):
+    """
+    Return gene and trait distributions for each person, all set to 0.
+    """
+    return {
         person: {
             "gene": {
                 2: 0,
@@ -62,39 +327,6 @@ def main():
         for person in people
     }
 
-    # Loop over all sets of people who might have the trait
-    names = set(people)
-    for have_trait in powerset(names):
-
-        # Check if current set of people violates known information
-        fails_evidence = any(
-            (people[person]["trait"] is not None and
-             people[person]["trait"] != (person in have_trait))
-            for person in names
-        )
-        if fails_evidence:
-            continue
-
-        # Loop over all sets of people who might have the gene
-        for one_gene in powerset(names):
-            for two_genes in powerset(names - one_gene):
-
-                # Update probabilities with new joint probability
-                p = joint_probability(people, one_gene, two_genes, have_trait)
-                update(probabilities, one_gene, two_genes, have_trait, p)
-
-    # Ensure probabilities sum to 1
-    normalize(probabilities)
-
-    # Print results
-    for person in people:
-        print(f"{person}:")
-        for field in probabilities[person]:
-            print(f"  {field.capitalize()}:")
-            for value in probabilities[person][field]:
-                p = probabilities[person][field][value]
-                print(f"    {value}: {p:.4f}")
-
 
 def load_data(filename):
     """
@@ -139,42 +371,34 @@ def normalize_distribution(dist: Dict[Any, float]):
     dist.update({key: val / norm for key, val in dist.items()})
 
 
-def p_not_p(p):
-    """p is the probability that something occurs 1 - p that something
-    does not occur"""
-    return {True: p, False: 1 - p}
-
-
 def prob_inherit(n, mutation_prob):
     """returns probability of inheriting the gene from a single parent
     given that the parent has n genes"""
-    p_inherit = p_not_p(n / 2)
-    p_mutation = p_not_p(mutation_prob)
-    return p_inherit[1] * p_mutation[0] + p_inherit[0] * p_mutation[1]
+    p_inherit = n / 2
+    return p_inherit * (1 - mutation_prob) + (1 - p_inherit) * mutation_prob
 
 
-def inherit_n_genes_prob(n, n_father, n_mother, mutation_prob) -> Dict:
-    """Returns dictionary with distribution of conditional probability of
-    inherited genes given that father has n_father genes and mother has
-    n_mother genes, taking into account probability of mutations."""
+def inherit_n_genes_prob(n, n_father, n_mother, mutation_prob) -> float:
+    """Returns conditional probability of inheriting n genes given that
+    father has n_father genes and mother has n_mother genes, taking into
+    account probability of mutations."""
 
-    # Probabily distributions:
-    # key 0 or False: probability of not inheriting the gene from parent
-    # key 1 or True: probability of inheriting the gene from parent
-    probs_f: Dict[bool, float] = p_not_p(prob_inherit(n_father,  mutation_prob))
-    probs_m: Dict[bool, float] = p_not_p(prob_inherit(n_mother,  mutation_prob))
+    # Probabilities of inheriting the gene from each parent
+    p_f = prob_inherit(n_father, mutation_prob)
+    p_m = prob_inherit(n_mother, mutation_prob)
 
     return (
         # Prob to not inherit at all
-        probs_f[0] * probs_m[0] if n == 0
+        (1 - p_f) * (1 - p_m) if n == 0
         # Prob to inherit from one parent only
-        else probs_f[1] * probs_m[0] + probs_f[0] * probs_m[1] if n == 1
+        else p_f * (1 - p_m) + (1 - p_f) * p_m if n == 1
         # Prob to inherit from both parents
-        else probs_f[1] * probs_m[1]
+        else p_f * p_m
     )
 
 
-def joint_probability(people: Set, one_gene: Set, two_genes: Set, have_trait):
+def joint_probability(people: Set, one_gene: Set, two_genes: Set, have_trait,
+                      model=None):
     """
     Compute and return a joint probability.
 
@@ -184,28 +408,16 @@ def joint_probability(people: Set, one_gene: Set, two_genes: Set, have_trait):
         * everyone not in `one_gene` or `two_gene` does not have the gene, and
         * everyone in set `have_trait` has the trait, and
         * everyone not in set` have_trait` does not have the trait.
-    """
-    joint_prob = 1
-
-    for person in people:
-        n_genes_person = number_of_genes(person, one_gene, two_genes)
-        father = people[person]["father"]
-        mother = people[person]["mother"]
-
-        # Include probabilities of number of genes
-        if father and mother:
-            n_genes_father = number_of_genes(father, one_gene, two_genes)
-            n_genes_mother = number_of_genes(mother, one_gene, two_genes)
-            joint_prob *= inherit_n_genes_prob(
-                n_genes_person, n_genes_father, n_genes_mother, PROBS["mutation"]
-            )
-        else:
-            joint_prob *= PROBS["gene"][n_genes_person]
-
-        # Include probabilities of trait
-        joint_prob *= PROBS["trait"][n_genes_person][person in have_trait]
 
-    return joint_prob
+    The product is taken in log space with `model`'s tables, built from
+    `PROBS` as it is now unless a `Model` is passed, so it only underflows
+    when the result itself is below the smallest float.
+    """
+    model = model or Model(PROBS)
+    genes = {
+        person: number_of_genes(person, one_gene, two_genes) for person in people
+    }
+    return math.exp(model.scorer(people)(genes, have_trait))
 
 
 def update(probabilities: Dict, one_gene, two_genes, have_trait, p):
@@ -233,5 +445,14 @@ def normalize(probabilities: Dict[str, Dict[str, Dict[Any, float]]]):
             normalize_distribution(distribution)
 
 
+ENGINES = {
+    "enumerate": enumerate_probabilities,
+    "exact": exact_probabilities,
+    "numpy": numpy_probabilities,
+    "gibbs": gibbs_probabilities,
+    "likelihood": likelihood_probabilities
+}
+
+
 if __name__ == "__main__":
     main()
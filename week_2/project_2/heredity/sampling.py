@@ -0,0 +1,356 @@
+import math
+import multiprocessing
+import random
+
+from heredity import GENES, Model, empty_probabilities, log, topological_order
+
+# Default number of samples (Gibbs sweeps, for Gibbs sampling) per chain
+SAMPLES = 10000
+
+# Fraction of Gibbs sweeps discarded before estimates are recorded
+BURN_IN = 0.1
+
+
+class Network():
+    """
+    Conditional probability tables of a family, with trait evidence
+    absorbed, in the form the samplers need them.
+    """
+
+    def __init__(self, people, probs):
+        model = Model(probs)
+        self.people = people
+        self.order = topological_order(people)
+        self.p_trait = [model.trait[genes][True] for genes in GENES]
+
+        self.parents = {
+            person: (data["mother"], data["father"])
+            for person, data in people.items()
+            if data["mother"] and data["father"]
+        }
+        self.children = {person: [] for person in people}
+        for child, parents in self.parents.items():
+            for parent in parents:
+                self.children[parent].append(child)
+
+        self.inherit = model.inherit
+        self.prior = model.prior
+
+        # Likelihood of each person's observed trait given their genes
+        self.evidence = {
+            person: model.evidence(data["trait"])
+            for person, data in people.items()
+        }
+
+    def gene_probability(self, person, genes, assignment):
+        """Probability of `person` having `genes` given their parents."""
+        if person in self.parents:
+            mother, father = self.parents[person]
+            return self.inherit[genes][assignment[mother]][assignment[father]]
+        return self.prior[genes]
+
+    def sample_ancestrally(self, rng, assignment):
+        """Samples everyone's genes from the prior, parents first."""
+        for person in self.order:
+            weights = [
+                self.gene_probability(person, genes, assignment)
+                for genes in GENES
+            ]
+            assignment[person] = rng.choices(GENES, weights).pop()
+        return assignment
+
+    def blanket_distribution(self, person, assignment):
+        """
+        Distribution of `person`'s genes given everyone else's genes and the
+        evidence: proportional to the probability of their genes given their
+        parents, of their trait, and of their children's genes.
+
+        If every number of genes is impossible given everyone else's genes,
+        as happens when the chain starts from an assignment the evidence
+        rules out, returns the distribution given their parents only, so
+        that the chain can move to a possible assignment.
+        """
+        weights = []
+        for genes in GENES:
+            assignment[person] = genes
+            weight = (self.gene_probability(person, genes, assignment)
+                      * self.evidence[person][genes])
+            for child in self.children[person]:
+                weight *= self.gene_probability(
+                    child, assignment[child], assignment
+                )
+            weights.append(weight)
+        total = sum(weights)
+        if total == 0:
+            return [
+                self.gene_probability(person, genes, assignment)
+                for genes in GENES
+            ]
+        return [weight / total for weight in weights]
+
+
+def likelihood_weighting(people, probs, samples, seed):
+    """
+    Samples genes from the prior, parents first, weighting each sample by
+    the likelihood of the observed traits.
+
+    Returns the chain's statistics: for each person, the weighted count of
+    each number of genes and of the trait, relative to exp(`shift`), the
+    largest log weight seen; and the sum of weights and of squared weights
+    relative to exp(shift) and exp(2 * shift). Samples the evidence rules
+    out have weight 0 and are only counted in the number of samples.
+    """
+    network = Network(people, probs)
+    rng = random.Random(seed)
+    gene_sums = {person: [0.0] * len(GENES) for person in people}
+    trait_sums = {person: 0.0 for person in people}
+    weight_sum = weight_squares = 0.0
+    shift = -math.inf
+
+    assignment = {}
+    for _ in range(samples):
+        network.sample_ancestrally(rng, assignment)
+        log_weight = sum(
+            log(network.evidence[person][assignment[person]])
+            for person in people if people[person]["trait"] is not None
+        )
+        if log_weight == -math.inf:
+            continue
+
+        # Rescale the sums if this is the heaviest sample so far
+        if log_weight > shift:
+            scale = math.exp(shift - log_weight)
+            for person in people:
+                gene_sums[person] = [s * scale for s in gene_sums[person]]
+                trait_sums[person] *= scale
+            weight_sum *= scale
+            weight_squares *= scale * scale
+            shift = log_weight
+        weight = math.exp(log_weight - shift)
+
+        weight_sum += weight
+        weight_squares += weight * weight
+        for person in people:
+            gene_sums[person][assignment[person]] += weight
+            trait_sums[person] += weight * network.p_trait[assignment[person]]
+
+    return {
+        "gene_sums": gene_sums, "trait_sums": trait_sums, "shift": shift,
+        "weight_sum": weight_sum, "weight_squares": weight_squares,
+        "samples": samples
+    }
+
+
+def gibbs_sampling(people, probs, samples, seed, burn_in=BURN_IN):
+    """
+    Resamples each person's genes in turn from their distribution given
+    everyone else's genes and the evidence, for `samples` sweeps after
+    discarding the first `burn_in` fraction of them.
+
+    Estimates are Rao-Blackwellized: every sweep records each person's
+    conditional gene distribution rather than the sampled value. Returns,
+    for each half of the recorded sweeps, the sums and sums of squares of
+    those distributions, so that convergence can be checked across halves.
+    """
+    network = Network(people, probs)
+    rng = random.Random(seed)
+    assignment = network.sample_ancestrally(rng, {})
+
+    warmup = int(samples * burn_in)
+    halves = [
+        {
+            "gene_sums": {person: [0.0] * len(GENES) for person in people},
+            "gene_squares": {person: [0.0] * len(GENES) for person in people},
+            "sweeps": 0
+        }
+        for _ in range(2)
+    ]
+    for sweep in range(warmup + samples):
+        recorded = sweep >= warmup
+        half = halves[int(sweep - warmup >= samples / 2)]
+        for person in network.order:
+            distribution = network.blanket_distribution(person, assignment)
+            assignment[person] = rng.choices(GENES, distribution).pop()
+            if recorded:
+                for genes, p in zip(GENES, distribution):
+                    half["gene_sums"][person][genes] += p
+                    half["gene_squares"][person][genes] += p * p
+        if recorded:
+            half["sweeps"] += 1
+
+    return {"halves": halves, "samples": samples}
+
+
+SAMPLERS = {
+    "likelihood": likelihood_weighting,
+    "gibbs": gibbs_sampling
+}
+
+
+def sample_probabilities(people, probs, method="gibbs", samples=SAMPLES,
+                         seed=None, chains=1, processes=None):
+    """
+    Return gene and trait distributions for each person, in the structure
+    `normalize` produces, estimated with `chains` independent chains of
+    `samples` samples each, and a dictionary of convergence diagnostics.
+
+    `method` is "likelihood" (likelihood weighting) or "gibbs" (Gibbs
+    sampling over gene variables). Chain k is seeded with `seed + k`. With
+    `processes` greater than 1, chains run in a pool of that many processes.
+    """
+    sampler = SAMPLERS[method]
+    arguments = [
+        (people, probs, samples, None if seed is None else seed + k)
+        for k in range(chains)
+    ]
+    if processes and processes > 1 and chains > 1:
+        with multiprocessing.Pool(processes) as pool:
+            results = pool.starmap(sampler, arguments)
+    else:
+        results = [sampler(*chain_arguments) for chain_arguments in arguments]
+
+    if method == "likelihood":
+        return merge_weighted(people, probs, results)
+    return merge_gibbs(people, probs, results)
+
+
+def merge_weighted(people, probs, results):
+    """
+    Merges likelihood weighting chains. Diagnostics are the effective sample
+    size, (sum of weights)^2 / (sum of squared weights), and the largest
+    standard error of any gene probability across chains, over the chains
+    with a sample of nonzero weight.
+    """
+    shift = max(result["shift"] for result in results)
+    if shift == -math.inf:
+        raise ValueError(
+            "every sample has zero weight: the evidence is impossible "
+            "under the sampled genes"
+        )
+    scales = [math.exp(result["shift"] - shift) for result in results]
+
+    probabilities = empty_probabilities(people)
+    weight_sum = sum(
+        scale * result["weight_sum"] for scale, result in zip(scales, results)
+    )
+    weight_squares = sum(
+        scale * scale * result["weight_squares"]
+        for scale, result in zip(scales, results)
+    )
+    for person in people:
+        for genes in GENES:
+            probabilities[person]["gene"][genes] = sum(
+                scale * result["gene_sums"][person][genes]
+                for scale, result in zip(scales, results)
+            ) / weight_sum
+        set_trait(probabilities, people, person, sum(
+            scale * result["trait_sums"][person]
+            for scale, result in zip(scales, results)
+        ) / weight_sum)
+
+    estimates = [
+        {
+            person: [s / result["weight_sum"] for s in result["gene_sums"][person]]
+            for person in people
+        }
+        for result in results if result["weight_sum"]
+    ]
+    return probabilities, {
+        "method": "likelihood",
+        "chains": len(results),
+        "samples": sum(result["samples"] for result in results),
+        "effective_samples": weight_sum ** 2 / weight_squares,
+        "max_standard_error": max_standard_error(people, estimates)
+    }
+
+
+def merge_gibbs(people, probs, results):
+    """
+    Merges Gibbs sampling chains. Diagnostics are the largest Gelman-Rubin
+    statistic (R-hat) of any gene probability, computed over the two halves
+    of every chain, which approaches 1 as chains converge, and the largest
+    standard error of any gene probability across chains.
+    """
+    halves = [half for result in results for half in result["halves"]]
+    sweeps = sum(half["sweeps"] for half in halves)
+
+    probabilities = empty_probabilities(people)
+    for person in people:
+        for genes in GENES:
+            probabilities[person]["gene"][genes] = sum(
+                half["gene_sums"][person][genes] for half in halves
+            ) / sweeps
+        set_trait(probabilities, people, person, sum(
+            probabilities[person]["gene"][genes] * probs["trait"][genes][True]
+            for genes in GENES
+        ))
+
+    estimates = [
+        {
+            person: [
+                sum(result["halves"][k]["gene_sums"][person][genes]
+                    for k in range(2))
+                / sum(half["sweeps"] for half in result["halves"])
+                for genes in GENES
+            ]
+            for person in people
+        }
+        for result in results
+    ]
+    return probabilities, {
+        "method": "gibbs",
+        "chains": len(results),
+        "samples": sum(result["samples"] for result in results),
+        "r_hat": max(
+            r_hat(halves, person, genes) for person in people for genes in GENES
+        ),
+        "max_standard_error": max_standard_error(people, estimates)
+    }
+
+
+def set_trait(probabilities, people, person, p_trait):
+    """Sets a person's trait distribution, unless their trait is known."""
+    trait = people[person]["trait"]
+    p = p_trait if trait is None else float(trait)
+    probabilities[person]["trait"].update({True: p, False: 1 - p})
+
+
+def r_hat(halves, person, genes):
+    """
+    Gelman-Rubin potential scale reduction of the probability of `person`
+    having `genes`, over chain halves of equal length.
+    """
+    n = min(half["sweeps"] for half in halves)
+    if n < 2:
+        return math.nan
+    means = [half["gene_sums"][person][genes] / half["sweeps"] for half in halves]
+    variances = [
+        (half["gene_squares"][person][genes] - half["sweeps"] * mean ** 2)
+        / (half["sweeps"] - 1)
+        for half, mean in zip(halves, means)
+    ]
+    grand_mean = sum(means) / len(means)
+    between = n * sum((m - grand_mean) ** 2 for m in means) / (len(means) - 1)
+    within = sum(variances) / len(variances)
+    if within <= 0:
+        return 1.0
+    pooled = (n - 1) / n * within + between / n
+    return math.sqrt(pooled / within)
+
+
+def max_standard_error(people, estimates):
+    """
+    Largest standard error, across chains, of any person's probability of
+    having any number of genes; NaN for a single chain.
+    """
+    m = len(estimates)
+    if m < 2:
+        return math.nan
+    largest = 0.0
+    for person in people:
+        for genes in GENES:
+            values = [estimate[person][genes] for estimate in estimates]
+            mean = sum(values) / m
+            variance = sum((v - mean) ** 2 for v in values) / (m - 1)
+            largest = max(largest, math.sqrt(variance / m))
+    return largest
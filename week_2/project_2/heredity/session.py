@@ -0,0 +1,259 @@
+import argparse
+import hashlib
+import json
+import os
+from typing import Dict, List
+
+from batch import canonical_form
+from elimination import (
+    Factor, JunctionTree, family_factors, person_factor, product
+)
+from heredity import (
+    GENES, PROBS, Model, empty_probabilities, load_data, print_probabilities
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python session.py data.csv [--cache DIR]\n"
+              "then one 'name trait' line per observation, "
+              "trait 1, 0 or ? for unknown"
+    )
+    parser.add_argument("data")
+    parser.add_argument("--cache", default=None,
+                        help="directory where results are cached")
+    args = parser.parse_args()
+    session = Session(load_data(args.data), cache=args.cache)
+    print_probabilities(session.people, session.probabilities())
+
+    while True:
+        try:
+            line = input("> ").split()
+        except EOFError:
+            break
+        if len(line) != 2 or line[0] not in session.people:
+            print("Expected: name 1|0|?")
+            continue
+        name, trait = line
+        session.set_trait(
+            name, True if trait == "1" else False if trait == "0" else None
+        )
+        print_probabilities(session.people, session.probabilities())
+
+
+class LazyJunctionTree(JunctionTree):
+    """
+    Junction tree whose messages are computed on demand and kept until a
+    factor they depend on changes.
+
+    Replacing a factor in a clique invalidates the upward messages of that
+    clique and its ancestors, and the downward messages of every clique
+    whose subtree does not contain it; the marginals then asked for only
+    recompute the messages they need.
+    """
+
+    def __init__(self, factors, order=None):
+        super().__init__(factors, order)
+        self.cliques = {
+            variable: clique for clique, variable in enumerate(self.variables)
+        }
+
+        # Clique and position holding each person's factor
+        self.holders = {}
+        for clique, factors in enumerate(self.factors):
+            for position, factor in enumerate(factors):
+                self.holders[factor.variables[0]] = (clique, position)
+
+    def calibrate(self):
+        """Forgets every message, to be recomputed when needed."""
+        n = len(self.variables)
+        self.upward: List[Factor] = [None] * n
+        self.downward: List[Factor] = [None] * n
+
+    def replace_factor(self, factor):
+        """Replaces the factor of the person `factor` is a factor of."""
+        clique, position = self.holders[factor.variables[0]]
+        self.factors[clique][position] = factor
+        self.potentials[clique] = product(self.factors[clique])
+
+        path = set()
+        while clique is not None:
+            path.add(clique)
+            self.upward[clique] = None
+            clique = self.parents[clique]
+        for clique in range(len(self.variables)):
+            if clique not in path:
+                self.downward[clique] = None
+
+    def ensure_upward(self, clique):
+        """Computes the missing upward messages of a clique's subtree."""
+        missing = []
+        stack = [clique]
+        while stack:
+            current = stack.pop()
+            if self.upward[current] is None:
+                missing.append(current)
+                stack.extend(self.children[current])
+
+        # Cliques are created after all of their children
+        for current in sorted(missing):
+            self.upward[current] = product(
+                [self.potentials[current]]
+                + [self.upward[child] for child in self.children[current]]
+            ).sum_out({self.variables[current]}).normalized()
+
+    def ensure_downward(self, clique):
+        """Computes the missing downward messages from the root to a clique."""
+        missing = []
+        while self.parents[clique] is not None and self.downward[clique] is None:
+            missing.append(clique)
+            clique = self.parents[clique]
+
+        for current in reversed(missing):
+            parent = self.parents[current]
+            for sibling in self.children[parent]:
+                if sibling != current:
+                    self.ensure_upward(sibling)
+            separator = set(self.scopes[current]) - {self.variables[current]}
+            self.downward[current] = product(
+                [self.potentials[parent]]
+                + self.incoming(parent, exclude=current)
+            ).sum_out(set(self.scopes[parent]) - separator).normalized()
+
+    def marginal(self, variable) -> Dict[int, float]:
+        """Returns the distribution of the genes of one person."""
+        clique = self.cliques[variable]
+        self.ensure_downward(clique)
+        for child in self.children[clique]:
+            self.ensure_upward(child)
+        belief = product([self.potentials[clique]] + self.incoming(clique))
+        return belief.sum_out(set(belief.variables) - {variable}).distribution()
+
+
+class Session():
+    """
+    Gene and trait distributions of one family, kept up to date as trait
+    observations are added, changed or removed one at a time.
+
+    The family's junction tree stays in memory and only the messages that an
+    observation affects are recomputed. Results are also kept for every
+    evidence seen in the session and, with `cache`, in that directory, keyed
+    by the family's structure and evidence up to renaming people (see
+    `batch.canonical_form`) and by `probs`.
+    """
+
+    def __init__(self, people, probs=PROBS, cache=None):
+        self.people = {person: dict(data) for person, data in people.items()}
+        self.probs = probs
+        self.model = Model(probs)
+        self.cache = cache
+        self.tree = LazyJunctionTree(family_factors(self.people, probs))
+
+        # Results by evidence, and marginals for the current evidence
+        self.results = {}
+        self.marginals = {}
+
+    def set_trait(self, person, trait):
+        """Records `person`'s trait: True, False or None if unknown."""
+        if self.people[person]["trait"] == trait:
+            return
+        self.people[person]["trait"] = trait
+        self.tree.replace_factor(person_factor(self.people, person, self.model))
+        self.marginals = {}
+
+    def evidence(self):
+        return tuple(data["trait"] for data in self.people.values())
+
+    def marginal(self, person) -> Dict[int, float]:
+        """Returns the distribution of the genes of one person."""
+        if person not in self.marginals:
+            self.marginals[person] = self.tree.marginal(person)
+        return self.marginals[person]
+
+    def probabilities(self):
+        """
+        Return gene and trait distributions for each person, in the
+        structure `normalize` produces, given the current evidence.
+        """
+        evidence = self.evidence()
+        if evidence not in self.results:
+            probabilities = self.load()
+            if probabilities is None:
+                probabilities = self.compute()
+                self.store(probabilities)
+            self.results[evidence] = probabilities
+        return self.results[evidence]
+
+    def compute(self):
+        probabilities = empty_probabilities(self.people)
+        for person, data in self.people.items():
+            genes = self.marginal(person)
+            probabilities[person]["gene"].update(genes)
+            if data["trait"] is None:
+                p_trait = sum(
+                    genes[n] * self.model.trait[n][True] for n in GENES
+                )
+            else:
+                p_trait = float(data["trait"])
+            probabilities[person]["trait"].update(
+                {True: p_trait, False: 1 - p_trait}
+            )
+        return probabilities
+
+    def cache_path(self):
+        """
+        Returns the cache file of the current evidence, and the order of
+        people its results are stored in.
+        """
+        signature, order = canonical_form(self.people)
+        key = json.dumps([signature, self.probs], sort_keys=True)
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return os.path.join(self.cache, f"{digest}.json"), order
+
+    def load(self):
+        """
+        Returns the cached results of the current evidence, if any. A cache
+        file that cannot be read counts as a miss.
+        """
+        if self.cache is None:
+            return None
+        path, order = self.cache_path()
+        try:
+            with open(path) as f:
+                stored = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(stored, list) or len(stored) != len(order):
+            return None
+        probabilities = empty_probabilities(self.people)
+        for person, (genes, p_trait) in zip(order, stored):
+            probabilities[person]["gene"].update(zip(GENES, genes))
+            probabilities[person]["trait"].update(
+                {True: p_trait, False: 1 - p_trait}
+            )
+        return probabilities
+
+    def store(self, probabilities):
+        """
+        Writes results to the cache, if there is one, to a temporary file
+        first, then renamed, so that an interrupted write leaves no
+        truncated entry behind.
+        """
+        if self.cache is None:
+            return
+        os.makedirs(self.cache, exist_ok=True)
+        path, order = self.cache_path()
+        stored = [
+            [
+                [probabilities[person]["gene"][n] for n in GENES],
+                probabilities[person]["trait"][True]
+            ]
+            for person in order
+        ]
+        with open(path + ".tmp", "w") as f:
+            json.dump(stored, f)
+        os.replace(path + ".tmp", path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import argparse
+import csv
+import itertools
+
+import numpy as np
+
+from elimination import family_factors
+from heredity import GENES, PROBS, Model, load_data
+from session import LazyJunctionTree
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python sweep.py data.csv [data.csv ...] [--mutation M ...] "
+              "[--prior P2,P1,P0 ...] [--penetrance T2,T1,T0 ...] "
+              "[--output sweep.csv]"
+    )
+    parser.add_argument("data", nargs="+")
+    parser.add_argument("--mutation", type=float, nargs="+",
+                        default=[PROBS["mutation"]])
+    parser.add_argument("--prior", type=triple, nargs="+",
+                        default=[tuple(PROBS["gene"][n] for n in (2, 1, 0))],
+                        help="probabilities of 2, 1 and 0 copies of the gene")
+    parser.add_argument("--penetrance", type=triple, nargs="+",
+                        default=[tuple(PROBS["trait"][n][True] for n in (2, 1, 0))],
+                        help="probabilities of the trait given 2, 1 and 0 copies")
+    parser.add_argument("--output", default="sweep.csv")
+    args = parser.parse_args()
+
+    grid = parameter_grid(args.mutation, args.prior, args.penetrance)
+    with open(args.output, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(COLUMNS)
+        for path in args.data:
+            writer.writerows(tidy_rows(path, grid, sweep(load_data(path), grid)))
+    print(f"{len(args.data)} families, {len(grid)} settings")
+
+
+# Columns of the tidy output table
+COLUMNS = [
+    "family", "setting", "mutation", "gene_2", "gene_1", "gene_0",
+    "trait_2", "trait_1", "trait_0", "person", "field", "value", "probability"
+]
+
+
+def triple(text):
+    """Parses three comma separated probabilities, for 2, 1 and 0 genes."""
+    values = tuple(float(value) for value in text.split(","))
+    if len(values) != 3:
+        raise argparse.ArgumentTypeError("expected three values")
+    return values
+
+
+def parameter_grid(mutations, priors, penetrances):
+    """
+    Returns a `PROBS`-like dictionary for every combination of a mutation
+    probability, gene prior and trait penetrance. Priors and penetrances
+    are triples for 2, 1 and 0 copies of the gene.
+    """
+    return [
+        {
+            "gene": dict(zip((2, 1, 0), prior)),
+            "trait": {
+                genes: {True: p, False: 1 - p}
+                for genes, p in zip((2, 1, 0), penetrance)
+            },
+            "mutation": mutation
+        }
+        for mutation, prior, penetrance
+        in itertools.product(mutations, priors, penetrances)
+    ]
+
+
+def sweep(people, grid):
+    """
+    Returns gene and trait distributions of every person under every
+    `PROBS`-like dictionary of `grid`: a dictionary mapping each person to
+    an array of gene probabilities, of shape (settings, genes), and an array
+    of trait probabilities, of shape (settings,).
+
+    The family's junction tree is built once; its messages are computed for
+    every setting at once, as arrays with a leading batch axis.
+    """
+    tree = LazyJunctionTree(family_factors(people, PROBS))
+    models = [Model(probs) for probs in grid]
+    inherit = np.array([model.inherit for model in models])
+    prior = np.array([model.prior for model in models])
+    trait = np.array([model.trait for model in models])
+
+    # Batched factor of each person, with trait evidence absorbed
+    def person_factor(person):
+        data = people[person]
+        table = np.ones((len(grid), len(GENES)))
+        if data["trait"] is not None:
+            table = trait[:, :, int(data["trait"])]
+        if data["mother"] and data["father"]:
+            return ((person, data["mother"], data["father"]),
+                    inherit * table[:, :, None, None])
+        return (person,), prior * table
+
+    potentials = [
+        [person_factor(factor.variables[0]) for factor in factors]
+        for factors in tree.factors
+    ]
+
+    n = len(tree.variables)
+    upward = [None] * n
+    for clique in range(n):
+        scope = set(tree.scopes[clique]) - {tree.variables[clique]}
+        upward[clique] = contract(
+            potentials[clique]
+            + [upward[child] for child in tree.children[clique]],
+            tuple(scope)
+        )
+
+    downward = [None] * n
+    for clique in reversed(range(n)):
+        parent = tree.parents[clique]
+        if parent is None:
+            continue
+        separator = set(tree.scopes[clique]) - {tree.variables[clique]}
+        factors = (
+            potentials[parent]
+            + [upward[child] for child in tree.children[parent] if child != clique]
+            + ([downward[parent]] if downward[parent] is not None else [])
+        )
+
+        # With nothing else in the parent, the message is constant
+        if factors:
+            downward[clique] = contract(factors, tuple(separator))
+
+    results = {}
+    for clique, person in enumerate(tree.variables):
+        genes = contract(
+            potentials[clique]
+            + [upward[child] for child in tree.children[clique]]
+            + ([downward[clique]] if downward[clique] is not None else []),
+            (person,)
+        )[1]
+        if people[person]["trait"] is None:
+            p_trait = np.einsum("bg,bg->b", genes, trait[:, :, 1])
+        else:
+            p_trait = np.full(len(grid), float(people[person]["trait"]))
+        results[person] = (genes, p_trait)
+    return results
+
+
+def contract(factors, variables):
+    """
+    Multiplies batched factors, (variables, array) pairs whose arrays have a
+    leading batch axis, and sums out every variable not in `variables`.
+    Returns the result over those of `variables` that the factors mention
+    (it is constant over the others), normalized in every batch.
+    """
+    ids = {}
+    operands = []
+    for factor_variables, table in factors:
+        operands.append(table)
+        operands.append(
+            [0] + [ids.setdefault(v, len(ids) + 1) for v in factor_variables]
+        )
+    variables = tuple(variable for variable in variables if variable in ids)
+    table = np.einsum(
+        *operands, [0] + [ids[variable] for variable in variables],
+        optimize=True
+    )
+    total = table.reshape(len(table), -1).sum(axis=1)
+    return variables, table / total.reshape((-1,) + (1,) * len(variables))
+
+
+def tidy_rows(family, grid, results):
+    """Returns one row of `COLUMNS` per setting, person, field and value."""
+    rows = []
+    for setting, probs in enumerate(grid):
+        parameters = (
+            [probs["mutation"]]
+            + [probs["gene"][n] for n in (2, 1, 0)]
+            + [probs["trait"][n][True] for n in (2, 1, 0)]
+        )
+        for person, (genes, p_trait) in results.items():
+            for n in (2, 1, 0):
+                rows.append([family, setting] + parameters
+                            + [person, "gene", n, genes[setting, n]])
+            for value, p in ((True, p_trait[setting]),
+                             (False, 1 - p_trait[setting])):
+                rows.append([family, setting] + parameters
+                            + [person, "trait", value, p])
+    return rows
+
+
+if __name__ == "__main__":
+    main()
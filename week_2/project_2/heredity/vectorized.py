@@ -0,0 +1,105 @@
+import numpy as np
+
+from heredity import GENES, Model, empty_probabilities
+
+# Number of gene assignments scored at once
+CHUNK_SIZE = 1 << 16
+
+
+def log_tables(model):
+    """
+    Returns the logarithms of a `Model`'s inheritance, prior and trait
+    tables as arrays, indexed like theirs.
+    """
+    return (
+        np.array(model.log_inherit),
+        np.array(model.log_prior),
+        np.array(model.log_trait)
+    )
+
+
+def log_joint_probabilities(people, names, genes, tables):
+    """
+    Returns the log joint probability of every row of `genes`, an integer
+    array of shape (assignments, people) whose columns follow `names`, from
+    the `log_tables` of a model. Only the traits observed in `people` are
+    scored, which is the joint probability summed over every unknown trait.
+    """
+    log_inherit, log_prior, log_trait = tables
+    column = {name: k for k, name in enumerate(names)}
+
+    log_p = np.zeros(len(genes))
+    for k, person in enumerate(names):
+        mother, father = people[person]["mother"], people[person]["father"]
+        if mother and father:
+            log_p += log_inherit[
+                genes[:, k], genes[:, column[mother]], genes[:, column[father]]
+            ]
+        else:
+            log_p += log_prior[genes[:, k]]
+
+        if people[person]["trait"] is not None:
+            log_p += log_trait[genes[:, k], int(people[person]["trait"])]
+    return log_p
+
+
+def gene_assignments(n_people, start, stop):
+    """
+    Returns the gene assignments numbered `start` .. `stop - 1`, as rows of
+    an integer array whose k-th column is the k-th base 3 digit of the row's
+    number.
+    """
+    numbers = np.arange(start, stop)
+    return (numbers[:, None] // 3 ** np.arange(n_people)) % 3
+
+
+def vectorized_probabilities(people, probs, chunk_size=CHUNK_SIZE):
+    """
+    Return gene and trait distributions for each person, summing the joint
+    probability of all 3^n gene assignments in chunks of `chunk_size`.
+
+    Probabilities are kept as logarithms and only exponentiated relative to
+    the largest one seen so far, so that large families do not underflow.
+    """
+    names = list(people)
+    n_assignments = len(GENES) ** len(names)
+    model = Model(probs)
+    tables = log_tables(model)
+    p_trait = np.array(model.trait)[:, 1]
+
+    # Weighted counts of each number of genes for each person, scaled by
+    # exp(-shift), and of the trait, for people whose trait is unknown
+    gene_sums = np.zeros((len(names), len(GENES)))
+    trait_sums = np.zeros(len(names))
+    shift = -np.inf
+
+    for start in range(0, n_assignments, chunk_size):
+        genes = gene_assignments(
+            len(names), start, min(start + chunk_size, n_assignments)
+        )
+        log_p = log_joint_probabilities(people, names, genes, tables)
+        if log_p.max() == -np.inf:
+            # Every assignment of the chunk is impossible
+            continue
+        if log_p.max() > shift:
+            gene_sums *= np.exp(shift - log_p.max())
+            trait_sums *= np.exp(shift - log_p.max())
+            shift = log_p.max()
+        weights = np.exp(log_p - shift)
+
+        for k in range(len(names)):
+            gene_sums[k] += np.bincount(
+                genes[:, k], weights=weights, minlength=len(GENES)
+            )
+            trait_sums[k] += weights @ p_trait[genes[:, k]]
+
+    probabilities = empty_probabilities(people)
+    for k, person in enumerate(names):
+        total = gene_sums[k].sum()
+        probabilities[person]["gene"].update(
+            {genes: gene_sums[k][genes] / total for genes in GENES}
+        )
+        trait = people[person]["trait"]
+        p = trait_sums[k] / total if trait is None else float(trait)
+        probabilities[person]["trait"].update({True: p, False: 1 - p})
+    return probabilities
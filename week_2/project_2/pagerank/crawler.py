@@ -0,0 +1,151 @@
+import argparse
+import multiprocessing
+import os
+import re
+from array import array
+
+import numpy as np
+
+# Same pattern as `pagerank.crawl`
+LINK = re.compile(r"<a\s+(?:[^>]*?)href=\"([^\"]*)\"")
+
+# Pages handed to a worker process at a time
+CHUNK_SIZE = 64
+
+# Characters of a file read at a time
+BLOCK_SIZE = 1 << 16
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python crawler.py corpus output [--processes P]"
+    )
+    parser.add_argument("corpus")
+    parser.add_argument("output", help="directory to write the graph to")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+    graph = crawl_graph(args.corpus, args.processes)
+    graph.save(args.output)
+    print(f"{len(graph.pages)} pages, {len(graph.sources)} links")
+
+
+class Graph():
+    """
+    Link graph of a corpus, with pages interned to integer ids: page
+    `sources[k]` links to page `targets[k]`, and `pages[i]` is the name of
+    page i. Links are sorted by source.
+    """
+
+    def __init__(self, pages, sources, targets):
+        self.pages = pages
+        self.sources = sources
+        self.targets = targets
+
+    def corpus(self):
+        """Returns the graph as a new corpus dictionary, as `crawl` does."""
+        corpus = {page: set() for page in self.pages}
+        for source, target in zip(self.sources.tolist(), self.targets.tolist()):
+            corpus[self.pages[source]].add(self.pages[target])
+        return corpus
+
+    def save(self, path):
+        """
+        Writes the graph to directory `path`: page names, one per line, and
+        the links as two arrays of 32-bit ids in NumPy's .npy format.
+        """
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, "pages.txt"), "w") as f:
+            for page in self.pages:
+                f.write(page + "\n")
+        np.save(os.path.join(path, "sources.npy"), self.sources)
+        np.save(os.path.join(path, "targets.npy"), self.targets)
+
+    @classmethod
+    def load(cls, path, mmap=True):
+        """Reads a graph written by `save`, memory-mapping its links."""
+        with open(os.path.join(path, "pages.txt")) as f:
+            pages = f.read().splitlines()
+        mode = "r" if mmap else None
+        return cls(
+            pages,
+            np.load(os.path.join(path, "sources.npy"), mmap_mode=mode),
+            np.load(os.path.join(path, "targets.npy"), mmap_mode=mode)
+        )
+
+
+def extract_links(path):
+    """
+    Returns the set of links of an HTML file, streamed in blocks of
+    `BLOCK_SIZE` characters so that memory does not grow with file size.
+
+    Text after the last "<" of a block that is not closed by a ">" is kept
+    for the next block, so that tags cut by a block boundary are still
+    found.
+    """
+    links = set()
+    pending = ""
+    with open(path) as f:
+        for block in iter(lambda: f.read(BLOCK_SIZE), ""):
+            text = pending + block
+            cut = text.rfind("<")
+            if cut == -1 or ">" in text[cut:]:
+                cut = len(text)
+            links.update(LINK.findall(text, 0, cut))
+            pending = text[cut:]
+    links.update(LINK.findall(pending))
+    return links
+
+
+def crawl_graph(directory, processes=None):
+    """
+    Parses a directory of HTML pages in a pool of `processes` processes and
+    returns its `Graph`, with the same links `crawl` finds: links to other
+    pages of the corpus, without links from a page to itself.
+    """
+    pages = sorted(
+        entry.name for entry in os.scandir(directory)
+        if entry.name.endswith(".html")
+    )
+    ids = {page: k for k, page in enumerate(pages)}
+    sources = array("i")
+    targets = array("i")
+
+    tasks = ((k, os.path.join(directory, page)) for k, page in enumerate(pages))
+    with multiprocessing.Pool(
+        processes, initializer=set_page_ids, initargs=(ids,)
+    ) as pool:
+        for source, linked in pool.imap(page_links, tasks, chunksize=CHUNK_SIZE):
+            sources.extend(array("i", [source]) * len(linked))
+            targets.extend(linked)
+
+    return Graph(
+        pages,
+        np.frombuffer(sources, dtype=np.int32),
+        np.frombuffer(targets, dtype=np.int32)
+    )
+
+
+# Ids of the pages of the corpus being crawled, in each worker process
+page_ids = {}
+
+
+def set_page_ids(ids):
+    global page_ids
+    page_ids = ids
+
+
+def page_links(task):
+    """
+    Returns a page's id and the sorted ids of the other pages of the corpus
+    it links to, as a compact array.
+    """
+    source, path = task
+    linked = sorted(
+        page_ids[link] for link in extract_links(path)
+        if link in page_ids and page_ids[link] != source
+    )
+    return source, array("i", linked)
+
+
+if __name__ == "__main__":
+    main()
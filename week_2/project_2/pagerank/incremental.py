@@ -0,0 +1,254 @@
+import heapq
+import math
+
+# Default bound on the L1 distance between maintained and exact ranks
+TOLERANCE = 1e-6
+
+# Work, in links visited, that pushes may take per link of the corpus
+# before an update falls back to warm-started sweeps over every page
+PUSH_BUDGET = 2
+
+
+class IncrementalPageRank():
+    """
+    PageRank values of a corpus kept up to date as links are inserted and
+    deleted, by a localized push method (Gauss-Southwell, as in Andersen,
+    Chung and Lang's approximate PageRank).
+
+    PageRank solves (I - d M) x = b, with b = (1 - d) / N on every page,
+    where column u of M spreads page u's rank over its links, or over every
+    page if it has none. Along with the ranks x, the residual
+    r = b - (I - d M) x is kept, one value per page, plus a scalar
+    `uniform` that stands for a residual of the same value on every page.
+    Pushing page u moves r[u] into x[u] and spreads d r[u] over the
+    residuals of the pages it links to, which shrinks the L1 norm of the
+    residual by at least (1 - d) |r[u]|. Since the columns of M sum to 1,
+    the ranks are within
+
+        (|r|_1 + N |uniform|) / (1 - d)
+
+    of the exact PageRank in L1 norm, which `error_bound` returns.
+
+    A link change only alters the column of its source, so it only changes
+    the residuals of the pages that source links to, before and after:
+    updates push from there, largest residual first, and stop as soon as
+    the bound is below `tolerance`. Pages without links spread their
+    residual over every page instead, through `uniform`. Since b is uniform
+    too, scaling x by 1 + a turns the residual into (1 + a) r plus a uniform
+    part that vanishes for a = N uniform / (1 - d - N uniform): the uniform
+    residual is cancelled by scaling every rank at once. Ranks and
+    residuals are stored divided by a common `scale`, so this takes
+    constant time.
+
+    When a change reaches so much of the corpus that pushing would cost
+    more than `PUSH_BUDGET` passes over every link, the update finishes
+    with Jacobi sweeps over every page instead, warm-started from the
+    current ranks.
+    """
+
+    def __init__(self, corpus, damping_factor, ranks=None, tolerance=TOLERANCE):
+        self.pages = list(corpus)
+        self.ids = {page: k for k, page in enumerate(self.pages)}
+        self.links = [
+            {self.ids[link] for link in corpus[page]} for page in self.pages
+        ]
+        self.n_links = sum(map(len, self.links))
+        self.damping_factor = damping_factor
+        self.tolerance = tolerance
+        self.n_pages = len(self.pages)
+
+        # Warm start from `ranks`, or start from the uniform distribution
+        if ranks is None:
+            self.values = [1 / self.n_pages] * self.n_pages
+        else:
+            self.values = [ranks[page] for page in self.pages]
+        self.scale = 1.0
+        self.reset_residual()
+
+        self.pushes = 0
+        self.sweeps = 0
+        self.push()
+
+    @property
+    def ranks(self):
+        """PageRank values of every page."""
+        return {
+            page: self.scale * value
+            for page, value in zip(self.pages, self.values)
+        }
+
+    def reset_residual(self):
+        """Computes the residual of the current ranks over every link."""
+        d = self.damping_factor
+        values = [self.scale * value for value in self.values]
+        dangling = math.fsum(
+            value for value, links in zip(values, self.links) if not links
+        )
+        base = ((1 - d) + d * dangling) / self.n_pages
+        residual = [base - value for value in values]
+        for value, links in zip(values, self.links):
+            if links:
+                share = d * value / len(links)
+                for link in links:
+                    residual[link] += share
+
+        self.values = values
+        self.scale = 1.0
+        self.residual = residual
+        self.uniform = 0.0
+        self.total = math.fsum(abs(r) for r in residual)
+        self.heap = [(-abs(r), k) for k, r in enumerate(residual) if r]
+        heapq.heapify(self.heap)
+
+    def error_bound(self):
+        """
+        Returns a bound on the L1 distance between the maintained and the
+        exact ranks, summing the residual exactly.
+        """
+        total = math.fsum(abs(r) for r in self.residual)
+        return (
+            (self.scale * total + self.n_pages * abs(self.uniform))
+            / (1 - self.damping_factor)
+        )
+
+    def update(self, insertions=(), deletions=()):
+        """
+        Inserts and deletes links, given as (page, linked page) pairs
+        between pages of the corpus, and brings the ranks within `tolerance`
+        of the new PageRank. Returns the bound on their error.
+
+        Raises ValueError, before changing any link, if a link has an end
+        that is not a page of the corpus.
+        """
+        insertions, deletions = list(insertions), list(deletions)
+        for page, link in insertions + deletions:
+            for end in (page, link):
+                if end not in self.ids:
+                    raise ValueError(f"{end} is not a page of the corpus")
+
+        changed = {}
+        for page, link in deletions:
+            source = self.ids[page]
+            changed.setdefault(source, set(self.links[source]))
+            if self.ids[link] in self.links[source]:
+                self.links[source].remove(self.ids[link])
+                self.n_links -= 1
+        for page, link in insertions:
+            source = self.ids[page]
+            changed.setdefault(source, set(self.links[source]))
+            if self.ids[link] not in self.links[source]:
+                self.links[source].add(self.ids[link])
+                self.n_links += 1
+
+        # Replace the old column of each changed page by its new one
+        for source, old_links in changed.items():
+            self.spread(old_links, -self.values[source])
+            self.spread(self.links[source], self.values[source])
+        self.push()
+        return self.bound()
+
+    def spread(self, links, value):
+        """
+        Adds `value` times the damping factor to the residuals of `links`,
+        split evenly, or to the uniform residual if there are no links.
+        """
+        d = self.damping_factor
+        if not links:
+            self.uniform += d * self.scale * value / self.n_pages
+            return
+        share = d * value / len(links)
+        residual, heap = self.residual, self.heap
+        for link in links:
+            old = residual[link]
+            new = old + share
+            residual[link] = new
+            self.total += abs(new) - abs(old)
+            heapq.heappush(heap, (-abs(new), link))
+
+    def bound(self):
+        """Returns the error bound from the running sum of the residual."""
+        return (
+            (self.scale * max(self.total, 0) + self.n_pages * abs(self.uniform))
+            / (1 - self.damping_factor)
+        )
+
+    def cancel_uniform(self):
+        """
+        Cancels the uniform residual by scaling every rank, or, if it is too
+        large for that, by adding it to every page's residual.
+        """
+        mass = self.n_pages * self.uniform
+        self.uniform = 0.0
+        if abs(mass) < (1 - self.damping_factor) / 2:
+            self.scale *= 1 + mass / (1 - self.damping_factor - mass)
+        else:
+            self.residual = [
+                r + mass / self.n_pages / self.scale for r in self.residual
+            ]
+            self.total = math.fsum(abs(r) for r in self.residual)
+            self.heap = [(-abs(r), k) for k, r in enumerate(self.residual)]
+            heapq.heapify(self.heap)
+
+    def push(self):
+        """
+        Pushes the page of largest residual until the error bound is below
+        the tolerance, or sweeps over every page once pushing has cost more
+        than `PUSH_BUDGET` passes over every link.
+        """
+        budget = PUSH_BUDGET * (self.n_links + self.n_pages)
+        work = 0
+        while self.bound() > self.tolerance:
+            if self.uniform:
+                self.cancel_uniform()
+                continue
+            if work > budget:
+                self.sweep()
+                return
+            if not self.heap:
+                # Every residual is 0: the running sum has drifted
+                self.total = 0.0
+                continue
+            magnitude, k = heapq.heappop(self.heap)
+            r = self.residual[k]
+            if -magnitude != abs(r) or r == 0:
+                continue
+            self.values[k] += r
+            self.residual[k] = 0.0
+            self.total -= abs(r)
+            self.spread(self.links[k], r)
+            self.pushes += 1
+            work += len(self.links[k]) + 1
+
+        # Drop entries of the heap made stale by later changes
+        if len(self.heap) > 4 * self.n_pages:
+            self.heap = [(-abs(r), k) for k, r in enumerate(self.residual) if r]
+            heapq.heapify(self.heap)
+
+    def sweep(self):
+        """
+        Applies the PageRank formula to every page at once (a Jacobi sweep)
+        until the error bound is below the tolerance. The change a sweep
+        makes to the ranks is their residual, so a sweep adds the residual
+        to the ranks, then computes the new residual.
+        """
+        while self.bound() > self.tolerance:
+            self.values = [
+                value + r for value, r in zip(self.values, self.residual)
+            ]
+            self.reset_residual()
+            self.sweeps += 1
+
+
+def update_pagerank(corpus, damping_factor, ranks, insertions=(),
+                    deletions=(), tolerance=TOLERANCE):
+    """
+    Returns PageRank values after inserting and deleting links of `corpus`,
+    warm-started from `ranks`, its PageRank values before the change, and
+    a bound on their L1 error. `corpus` is left untouched.
+
+    To apply many changes in turn, keep an `IncrementalPageRank` instead:
+    this function computes the residual of `ranks` over every link first.
+    """
+    pagerank = IncrementalPageRank(corpus, damping_factor, ranks, tolerance)
+    bound = pagerank.update(insertions, deletions)
+    return pagerank.ranks, bound
@@ -1,7 +1,7 @@
+import argparse
 import os
 import random
 import re
-import sys
 from collections import Counter
 
 DAMPING = 0.85
@@ -9,15 +9,57 @@ SAMPLES = 10000
 
 
 def main():
-    if len(sys.argv) != 2:
-        sys.exit("Usage: python pagerank.py corpus")
-    corpus = crawl(sys.argv[1])
-    ranks = sample_pagerank(corpus, DAMPING, SAMPLES)
+    parser = argparse.ArgumentParser(
+        usage="python pagerank.py corpus [--crawl CRAWLER] [--sample ENGINE] "
+              "[--iterate ENGINE] [--solver SOLVER] [--tolerance TOLERANCE] "
+              "[--max-iterations N]"
+    )
+    parser.add_argument("corpus")
+    parser.add_argument("--crawl", default="python",
+                        choices=list(CRAWLERS))
+    parser.add_argument("--sample", default="python",
+                        choices=list(SAMPLING_ENGINES))
+    parser.add_argument("--iterate", default=None,
+                        choices=list(ITERATION_ENGINES),
+                        help="python by default, sparse if a solver option "
+                             "is given")
+    parser.add_argument("--solver", default=None,
+                        help="solver of the sparse iteration engine, one of "
+                             "solvers.SOLVERS, power by default")
+    parser.add_argument("--tolerance", type=float, default=None,
+                        help="L1 residual at which the sparse iteration "
+                             "engine stops")
+    parser.add_argument("--max-iterations", type=int, default=None,
+                        help="iterations after which the sparse iteration "
+                             "engine stops")
+    args = parser.parse_args()
+
+    # Solver options select the sparse iteration engine
+    solver_options = [args.solver, args.tolerance, args.max_iterations]
+    if args.iterate is None:
+        args.iterate = "python" if solver_options == [None] * 3 else "sparse"
+    elif args.iterate != "sparse" and solver_options != [None] * 3:
+        parser.error("--solver, --tolerance and --max-iterations require "
+                     "--iterate sparse")
+    if args.solver is None:
+        args.solver = "power"
+    elif args.solver not in solver_names():
+        parser.error(f"--solver must be one of {', '.join(solver_names())}")
+
+    corpus = CRAWLERS[args.crawl](args.corpus)
+    ranks = SAMPLING_ENGINES[args.sample](corpus, DAMPING, SAMPLES)
     print(f"PageRank Results from Sampling (n = {SAMPLES})")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
-    ranks = iterate_pagerank(corpus, DAMPING)
-    print(f"PageRank Results from Iteration")
+    if args.iterate == "sparse":
+        ranks, iterations, residual = solve_pagerank(
+            corpus, DAMPING, args.solver, args.tolerance, args.max_iterations
+        )
+        print(f"PageRank Results from Iteration ({args.solver}, "
+              f"{iterations} iterations, residual {residual:.2e})")
+    else:
+        ranks = ITERATION_ENGINES[args.iterate](corpus, DAMPING)
+        print(f"PageRank Results from Iteration")
     for page in sorted(ranks):
         print(f"  {page}: {ranks[page]:.4f}")
 
@@ -49,6 +91,25 @@ def crawl(directory):
     return pages
 
 
+def parallel_crawl(directory):
+    """
+    Parse a directory of HTML pages like `crawl`, streaming every file in a
+    pool of processes (see crawler.py). Requires NumPy.
+    """
+    from crawler import crawl_graph
+    return crawl_graph(directory).corpus()
+
+
+def snapshot_crawl(directory):
+    """
+    Parse a directory of HTML pages like `crawl`, reusing the link graph
+    saved next to it, `directory.snapshot`, and only parsing pages added or
+    changed since (see snapshot.py). Requires NumPy.
+    """
+    from snapshot import snapshot_crawl
+    return snapshot_crawl(directory).corpus()
+
+
 def transition_model(corpus, page, damping_factor):
     """
     Return a probability distribution over which page to visit next,
@@ -133,18 +194,17 @@ def iterate_pagerank(corpus, damping_factor):
     # Total number of pages
     N_pages = len(corpus)
 
-    # Number of links per page
+    # Links and number of links per page, leaving `corpus` untouched
+    links = {}
     N_links = {}
     for page in corpus:
-        n_links = len(corpus[page])
         # If page has no links at all, assume it has links to all pages
-        corpus[page] = corpus[page] if n_links else set(corpus)
-        n_links = n_links if n_links else N_pages
-        N_links[page] = n_links
+        links[page] = corpus[page] if corpus[page] else set(corpus)
+        N_links[page] = len(links[page])
 
     # format: {page: set(all pages that have a link to page)}
     parents = {
-        page: set(parent for parent, links in corpus.items() if page in links)
+        page: set(parent for parent in corpus if page in links[parent])
         for page in corpus
     }
 
@@ -169,5 +229,67 @@ def iterate_pagerank(corpus, damping_factor):
     return pages_rank
 
 
+def sparse_pagerank(corpus, damping_factor):
+    """
+    Return PageRank values for each page by power iteration over a sparse
+    transition matrix (see solvers.py), for corpora of millions of pages.
+    Requires NumPy and SciPy.
+    """
+    from solvers import sparse_pagerank
+    return sparse_pagerank(corpus, damping_factor)
+
+
+def solver_names():
+    """
+    Return the names of the solvers of the sparse iteration engine.
+    Requires NumPy and SciPy.
+    """
+    from solvers import SOLVERS
+    return list(SOLVERS)
+
+
+def solve_pagerank(corpus, damping_factor, solver="power", tolerance=None,
+                   max_iterations=None):
+    """
+    Return PageRank values for each page from one of the solvers of
+    solvers.py (power iteration, with quadratic extrapolation,
+    Gauss-Seidel or GMRES), along with the number of iterations it took and
+    the L1 residual of the result. `tolerance` and `max_iterations` default
+    to those of solvers.py. Requires NumPy and SciPy.
+    """
+    import solvers
+    return solvers.solve_pagerank(
+        corpus, damping_factor, solver,
+        solvers.TOLERANCE if tolerance is None else tolerance,
+        solvers.MAX_ITERATIONS if max_iterations is None else max_iterations
+    )
+
+
+def numpy_sample_pagerank(corpus, damping_factor, n):
+    """
+    Return PageRank values for each page from `n` visits of many random
+    surfers walking in parallel with NumPy (see sampling.py).
+    """
+    from sampling import walk_pagerank
+    return walk_pagerank(corpus, damping_factor, n)
+
+
+CRAWLERS = {
+    "python": crawl,
+    "parallel": parallel_crawl,
+    "snapshot": snapshot_crawl
+}
+
+SAMPLING_ENGINES = {
+    "python": sample_pagerank,
+    "numpy": numpy_sample_pagerank
+}
+
+ITERATION_ENGINES = {
+    "python": iterate_pagerank,
+    "sparse": sparse_pagerank
+}
+
+
 if __name__ == "__main__":
     main()
@@ -0,0 +1,79 @@
+import numpy as np
+
+from solvers import link_arrays
+
+# Number of random surfers walking the corpus in parallel
+WALKERS = 1000
+
+# Steps each surfer takes before its visits are counted. Starting from a
+# random page, a surfer's distribution is within damping_factor^k of the
+# PageRank distribution, in total variation, after k steps.
+BURN_IN = 50
+
+# Number of visits recorded between two updates of the counts
+CHUNK_SIZE = 1 << 20
+
+
+def out_links(sources, targets, n_pages):
+    """
+    Returns the links of every page in CSR form: the links of page i are
+    `indices[indptr[i]:indptr[i + 1]]`.
+    """
+    order = np.argsort(sources, kind="stable")
+    indptr = np.zeros(n_pages + 1, dtype=np.int64)
+    np.cumsum(np.bincount(sources, minlength=n_pages), out=indptr[1:])
+    return indptr, targets[order]
+
+
+def random_walks(indptr, indices, damping_factor, n, walkers=WALKERS,
+                 burn_in=BURN_IN, seed=None):
+    """
+    Returns the number of visits of every page by `walkers` independent
+    random surfers, moving all at once, until at least `n` visits are
+    recorded after `burn_in` steps.
+
+    At every step, each surfer follows a random link of its page with
+    probability `damping_factor` and jumps to a random page otherwise, or
+    if its page has no links.
+    """
+    rng = np.random.default_rng(seed)
+    n_pages = len(indptr) - 1
+    degree = np.diff(indptr)
+    counts = np.zeros(n_pages, dtype=np.int64)
+
+    steps = burn_in + -(-n // walkers)
+    rows = max(1, CHUNK_SIZE // walkers)
+    visits = np.empty((rows, walkers), dtype=np.int64)
+    filled = 0
+
+    positions = rng.integers(n_pages, size=walkers)
+    for step in range(steps):
+        if step >= burn_in:
+            visits[filled] = positions
+            filled += 1
+            if filled == rows:
+                counts += np.bincount(visits.ravel(), minlength=n_pages)
+                filled = 0
+
+        # Decide for every surfer at once whether it follows a link
+        follow = (rng.random(walkers) < damping_factor) & (degree[positions] > 0)
+        followers = positions[follow]
+        offsets = (rng.random(len(followers)) * degree[followers]).astype(np.int64)
+        positions = rng.integers(n_pages, size=walkers)
+        positions[follow] = indices[indptr[followers] + offsets]
+
+    counts += np.bincount(visits[:filled].ravel(), minlength=n_pages)
+    return counts
+
+
+def walk_pagerank(corpus, damping_factor, n, walkers=WALKERS, seed=None):
+    """
+    Return PageRank values for each page, as `sample_pagerank` does, from
+    the visits of many random surfers walking in parallel.
+    """
+    pages, sources, targets = link_arrays(corpus)
+    indptr, indices = out_links(sources, targets, len(pages))
+    counts = random_walks(
+        indptr, indices, damping_factor, n, walkers=min(walkers, n), seed=seed
+    )
+    return dict(zip(pages, (counts / counts.sum()).tolist()))
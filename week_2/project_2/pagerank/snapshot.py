@@ -0,0 +1,226 @@
+import argparse
+import multiprocessing
+import os
+import shutil
+
+import numpy as np
+
+from crawler import CHUNK_SIZE, Graph, extract_links
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        usage="python snapshot.py corpus [snapshot] [--processes P]"
+    )
+    parser.add_argument("corpus")
+    parser.add_argument("snapshot", nargs="?", default=None,
+                        help="directory of the snapshot, corpus.snapshot "
+                             "by default")
+    parser.add_argument("--processes", type=int, default=None)
+    args = parser.parse_args()
+    snapshot = Snapshot(args.snapshot or default_path(args.corpus))
+    changes = snapshot.update(args.corpus, args.processes)
+    snapshot.save()
+    print(", ".join(f"{n} {change}" for change, n in changes.items()))
+
+
+def default_path(directory):
+    """Returns where the snapshot of a corpus is kept by default."""
+    return os.path.normpath(directory) + ".snapshot"
+
+
+class Snapshot():
+    """
+    Link graph of a corpus kept on disk between runs, along with the size
+    and modification time of every page it was parsed from, so that a
+    re-crawl only parses pages that were added or changed.
+
+    Every name a page links to is interned, whether it is a page of the
+    corpus or not: links to a name are kept when it is not a page, and come
+    to life when a page of that name is added. `present` marks the names
+    that are pages. `sources` and `targets` hold the ids of the linking page
+    and the linked name of every link, sorted by source.
+    """
+
+    # Arrays stored as .npy files, memory-mapped when loaded
+    ARRAYS = ("present", "mtimes", "sizes", "sources", "targets")
+
+    def __init__(self, path):
+        self.path = path
+        if not self.load():
+            self.names = []
+            self.present = np.zeros(0, dtype=bool)
+            self.mtimes = np.zeros(0, dtype=np.int64)
+            self.sizes = np.zeros(0, dtype=np.int64)
+            self.sources = np.zeros(0, dtype=np.int32)
+            self.targets = np.zeros(0, dtype=np.int32)
+
+    def load(self):
+        """
+        Reads the snapshot at `path`, memory-mapping its arrays. Returns
+        False, leaving the snapshot unread, if there is none or if its files
+        do not fit together, as when they come from different saves: the
+        snapshot is then rebuilt from scratch.
+        """
+        try:
+            with open(os.path.join(self.path, "names.txt")) as f:
+                names = f.read().splitlines()
+            arrays = {
+                name: np.load(
+                    os.path.join(self.path, f"{name}.npy"), mmap_mode="r"
+                )
+                for name in self.ARRAYS
+            }
+        except (OSError, ValueError):
+            return False
+        if not (
+            len(arrays["present"]) == len(arrays["mtimes"])
+            == len(arrays["sizes"]) == len(names)
+            and len(arrays["sources"]) == len(arrays["targets"])
+            and (len(arrays["targets"]) == 0
+                 or max(arrays["sources"].max(),
+                        arrays["targets"].max()) < len(names))
+        ):
+            return False
+        self.names = names
+        for name, values in arrays.items():
+            setattr(self, name, values)
+        return True
+
+    def update(self, directory, processes=None):
+        """
+        Brings the snapshot up to date with a directory of HTML pages,
+        parsing only the pages whose size or modification time changed and
+        the new ones, in a pool of `processes` processes. Returns the number
+        of added, changed, deleted and unchanged pages.
+        """
+        ids = {name: k for k, name in enumerate(self.names)}
+        stats = {
+            entry.name: entry.stat()
+            for entry in os.scandir(directory) if entry.name.endswith(".html")
+        }
+
+        changes = {"added": 0, "changed": 0, "deleted": 0, "unchanged": 0}
+        parse = []
+        for page, stat in stats.items():
+            k = ids.get(page)
+            if k is None or not self.present[k]:
+                changes["added"] += 1
+                parse.append(page)
+            elif (self.mtimes[k], self.sizes[k]) != (stat.st_mtime_ns, stat.st_size):
+                changes["changed"] += 1
+                parse.append(page)
+            else:
+                changes["unchanged"] += 1
+        deleted = [
+            k for k in np.flatnonzero(self.present).tolist()
+            if self.names[k] not in stats
+        ]
+        changes["deleted"] = len(deleted)
+        if not parse and not deleted:
+            return changes
+
+        # Intern new pages, then parse pages and intern the names they link to
+        for page in parse:
+            ids.setdefault(page, len(ids))
+        paths = [os.path.join(directory, page) for page in parse]
+        new_sources = []
+        new_targets = []
+        with multiprocessing.Pool(processes) as pool:
+            for page, links in zip(
+                parse, pool.imap(extract_links, paths, chunksize=CHUNK_SIZE)
+            ):
+                linked = sorted(
+                    ids.setdefault(link, len(ids)) for link in links - {page}
+                )
+                new_sources.extend([ids[page]] * len(linked))
+                new_targets.extend(linked)
+
+        n_names = len(ids)
+        self.names = self.names + list(ids)[len(self.names):]
+        present = grow(self.present, n_names)
+        mtimes = grow(self.mtimes, n_names)
+        sizes = grow(self.sizes, n_names)
+        present[deleted] = False
+        for page in parse:
+            present[ids[page]] = True
+            mtimes[ids[page]] = stats[page].st_mtime_ns
+            sizes[ids[page]] = stats[page].st_size
+
+        # Drop the links of reparsed and deleted pages and splice in new ones
+        stale = np.zeros(n_names, dtype=bool)
+        stale[deleted] = True
+        stale[[ids[page] for page in parse]] = True
+        keep = ~stale[self.sources]
+        sources = np.concatenate([
+            self.sources[keep], np.array(new_sources, dtype=np.int32)
+        ])
+        targets = np.concatenate([
+            self.targets[keep], np.array(new_targets, dtype=np.int32)
+        ])
+        order = np.argsort(sources, kind="stable")
+
+        self.present, self.mtimes, self.sizes = present, mtimes, sizes
+        self.sources, self.targets = sources[order], targets[order]
+        return changes
+
+    def save(self):
+        """
+        Writes the snapshot to a new directory, then swaps it in for the old
+        one by renaming both, so that an interrupted save leaves either the
+        old snapshot or none, never a mix of old and new files. Snapshots
+        memory-mapped by other processes stay valid, since their files are
+        unlinked rather than overwritten.
+        """
+        new = self.path + ".new"
+        old = self.path + ".old"
+        shutil.rmtree(new, ignore_errors=True)
+        os.makedirs(new)
+        with open(os.path.join(new, "names.txt"), "w") as f:
+            f.write("".join(name + "\n" for name in self.names))
+        for name in self.ARRAYS:
+            np.save(os.path.join(new, f"{name}.npy"), getattr(self, name))
+
+        shutil.rmtree(old, ignore_errors=True)
+        if os.path.exists(self.path):
+            os.rename(self.path, old)
+        os.rename(new, self.path)
+        shutil.rmtree(old, ignore_errors=True)
+
+    def graph(self):
+        """
+        Returns the `Graph` of the pages of the snapshot, with pages
+        numbered in the order they were first seen.
+        """
+        present = np.asarray(self.present)
+        ids = np.cumsum(present) - 1
+        live = present[self.targets]
+        pages = [name for name, page in zip(self.names, present.tolist()) if page]
+        return Graph(
+            pages,
+            ids[self.sources[live]].astype(np.int32),
+            ids[self.targets[live]].astype(np.int32)
+        )
+
+
+def grow(values, n):
+    """Returns a writable copy of an array padded with zeros to length n."""
+    grown = np.zeros(n, dtype=values.dtype)
+    grown[:len(values)] = values
+    return grown
+
+
+def snapshot_crawl(directory, path=None, processes=None):
+    """
+    Returns the `Graph` of a directory of HTML pages, updating its snapshot
+    at `path`, or the default path, first.
+    """
+    snapshot = Snapshot(path or default_path(directory))
+    changes = snapshot.update(directory, processes)
+    if changes["added"] or changes["changed"] or changes["deleted"]:
+        snapshot.save()
+    return snapshot.graph()
+
+
+if __name__ == "__main__":
+    main()
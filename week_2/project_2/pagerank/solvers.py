@@ -0,0 +1,243 @@
+import numpy as np
+from scipy import sparse
+from scipy.sparse import linalg
+
+# Convergence threshold on the L1 norm of the residual of the ranks, the
+# change one more iteration of the PageRank formula would make to them
+TOLERANCE = 1e-10
+
+# Largest number of iterations before giving up on convergence
+MAX_ITERATIONS = 1000
+
+# Inner iterations of GMRES between two restarts
+RESTART = 20
+
+
+def link_arrays(corpus):
+    """
+    Returns the list of pages of `corpus` and its links as two integer
+    arrays of equal length, the indices of the linking and linked pages.
+    """
+    pages = list(corpus)
+    index = {page: k for k, page in enumerate(pages)}
+    counts = np.fromiter(
+        (len(corpus[page]) for page in pages), dtype=np.int64, count=len(pages)
+    )
+    targets = np.fromiter(
+        (index[link] for page in pages for link in corpus[page]),
+        dtype=np.int64, count=counts.sum()
+    )
+    sources = np.repeat(np.arange(len(pages)), counts)
+    return pages, sources, targets
+
+
+def transition_matrix(sources, targets, n_pages):
+    """
+    Returns the CSR matrix whose column i spreads the rank of page i evenly
+    over the pages it links to, and a boolean mask of dangling pages, those
+    without links. Their columns are left empty: instead of materializing
+    links from them to every page, iterations redistribute their rank
+    uniformly as a rank-one correction.
+    """
+    out_degree = np.bincount(sources, minlength=n_pages)
+    matrix = sparse.csr_matrix(
+        (1 / out_degree[sources], (targets, sources)), shape=(n_pages, n_pages)
+    )
+    return matrix, out_degree == 0
+
+
+def pagerank_step(matrix, dangling, damping_factor, ranks):
+    """
+    Applies the PageRank formula to every page once, spreading the rank of
+    dangling pages uniformly.
+    """
+    n_pages = matrix.shape[0]
+    return damping_factor * (
+        matrix @ ranks + ranks[dangling].sum() / n_pages
+    ) + (1 - damping_factor) / n_pages
+
+
+def residual(matrix, dangling, damping_factor, ranks):
+    """
+    Returns the L1 norm of the change one more iteration of the PageRank
+    formula would make to `ranks`. The ranks are within this residual
+    divided by 1 - damping_factor of the exact PageRank, in L1 norm.
+    """
+    return np.abs(
+        pagerank_step(matrix, dangling, damping_factor, ranks) - ranks
+    ).sum()
+
+
+def power_iteration(matrix, dangling, damping_factor, tolerance=TOLERANCE,
+                    max_iterations=MAX_ITERATIONS):
+    """
+    Iterates the PageRank formula from the uniform distribution (Jacobi
+    iteration) until the residual falls below `tolerance`, or for
+    `max_iterations` iterations. Returns the rank vector, the number of
+    iterations and its residual.
+    """
+    n_pages = matrix.shape[0]
+    ranks = np.full(n_pages, 1 / n_pages)
+    change = np.inf
+    iterations = 0
+    while change >= tolerance and iterations < max_iterations:
+        new_ranks = pagerank_step(matrix, dangling, damping_factor, ranks)
+        change = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        iterations += 1
+    return ranks, iterations, residual(matrix, dangling, damping_factor, ranks)
+
+
+def extrapolated_iteration(matrix, dangling, damping_factor,
+                           tolerance=TOLERANCE, max_iterations=MAX_ITERATIONS,
+                           period=10):
+    """
+    Power iteration accelerated by quadratic extrapolation (Kamvar et al.,
+    2003) every `period` iterations: assuming the last four iterates are
+    dominated by the stationary distribution and the next two eigenvectors
+    of the iteration, the stationary distribution is solved for from them
+    by least squares. Returns the rank vector, the number of iterations and
+    its residual.
+    """
+    n_pages = matrix.shape[0]
+    ranks = np.full(n_pages, 1 / n_pages)
+    history = [ranks]
+    change = np.inf
+    iterations = 0
+    while change >= tolerance and iterations < max_iterations:
+        new_ranks = pagerank_step(matrix, dangling, damping_factor, ranks)
+        change = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        iterations += 1
+        history = history[-3:] + [ranks]
+        if iterations % period == 0 and len(history) == 4:
+            ranks = quadratic_extrapolation(*history)
+            history = [ranks]
+    return ranks, iterations, residual(matrix, dangling, damping_factor, ranks)
+
+
+def quadratic_extrapolation(x0, x1, x2, x3):
+    """
+    Returns the quadratic extrapolation of four successive iterates,
+    normalized to sum to 1.
+    """
+    y = np.column_stack([x1 - x0, x2 - x0])
+    gamma, *_ = np.linalg.lstsq(y, -(x3 - x0), rcond=None)
+    gamma1, gamma2 = gamma
+    extrapolated = (
+        (gamma1 + gamma2 + 1) * x1 + (gamma2 + 1) * x2 + x3
+    )
+    extrapolated = np.abs(extrapolated)
+    return extrapolated / extrapolated.sum()
+
+
+def gauss_seidel(matrix, dangling, damping_factor, tolerance=TOLERANCE,
+                 max_iterations=MAX_ITERATIONS):
+    """
+    Gauss-Seidel iteration on (I - d M) x = (1 - d) / N: pages are updated
+    in order, each from the ranks already updated this iteration, by
+    solving the lower triangular part of the system. The rank of dangling
+    pages is spread from the previous iterate, so the ranks are normalized
+    to sum to 1 after every iteration: otherwise their total would only
+    converge at the rate of the damping factor. Returns the rank vector,
+    the number of iterations and its residual.
+    """
+    n_pages = matrix.shape[0]
+    system = (sparse.identity(n_pages, format="csr")
+              - damping_factor * matrix).tocsr()
+    lower = sparse.tril(system, format="csr")
+    upper = sparse.triu(system, k=1, format="csr")
+    ranks = np.full(n_pages, 1 / n_pages)
+    change = np.inf
+    iterations = 0
+    while change >= tolerance and iterations < max_iterations:
+        right = (
+            (1 - damping_factor + damping_factor * ranks[dangling].sum())
+            / n_pages
+        ) - upper @ ranks
+        new_ranks = linalg.spsolve_triangular(lower, right, lower=True)
+        new_ranks /= new_ranks.sum()
+        change = np.abs(new_ranks - ranks).sum()
+        ranks = new_ranks
+        iterations += 1
+    return ranks, iterations, residual(matrix, dangling, damping_factor, ranks)
+
+
+def gmres(matrix, dangling, damping_factor, tolerance=TOLERANCE,
+          max_iterations=MAX_ITERATIONS):
+    """
+    Solves (I - d M) x = (1 - d) / N with GMRES, applying the rank-one
+    dangling correction matrix-free. Returns the rank vector, normalized
+    to sum to 1, the number of iterations and its residual.
+
+    Iterations are inner iterations, one product with the matrix each, as
+    for the other solvers: GMRES restarts every `RESTART` of them, and the
+    last cycle is cut short so that at most `max_iterations` are run.
+
+    The residual of this system is the one `residual` measures. GMRES
+    bounds it in L2 norm, so it is asked for `tolerance` / (2 sqrt(N)): the
+    L1 residual is at most sqrt(N) times the L2 one, and normalizing x to
+    sum to 1 at most doubles it, since the columns of I - d M sum to 1 - d
+    and so the sum of x is off by at most the L1 residual / (1 - d).
+    """
+    n_pages = matrix.shape[0]
+
+    def apply(x):
+        return x - damping_factor * (matrix @ x + x[dangling].sum() / n_pages)
+
+    operator = linalg.LinearOperator((n_pages, n_pages), matvec=apply)
+    right = np.full(n_pages, (1 - damping_factor) / n_pages)
+    ranks = np.full(n_pages, 1 / n_pages)
+    iterations = 0
+
+    def count(_):
+        nonlocal iterations
+        iterations += 1
+
+    # One restart cycle at a time, the last one no longer than the cap
+    converged = False
+    while not converged and iterations < max_iterations:
+        ranks, info = linalg.gmres(
+            operator, right, x0=ranks,
+            rtol=0, atol=tolerance / (2 * np.sqrt(n_pages)),
+            restart=min(RESTART, max_iterations - iterations), maxiter=1,
+            callback=count, callback_type="pr_norm"
+        )
+        converged = info == 0
+    ranks = ranks / ranks.sum()
+    return ranks, iterations, residual(matrix, dangling, damping_factor, ranks)
+
+
+SOLVERS = {
+    "power": power_iteration,
+    "extrapolated": extrapolated_iteration,
+    "gauss-seidel": gauss_seidel,
+    "gmres": gmres
+}
+
+
+def solve_pagerank(corpus, damping_factor, solver="power", tolerance=TOLERANCE,
+                   max_iterations=MAX_ITERATIONS):
+    """
+    Return PageRank values for each page, as `iterate_pagerank` does, with
+    one of `SOLVERS` over a sparse transition matrix, along with the number
+    of iterations it took and the L1 residual of the result.
+    """
+    pages, sources, targets = link_arrays(corpus)
+    matrix, dangling = transition_matrix(sources, targets, len(pages))
+    ranks, iterations, final_residual = SOLVERS[solver](
+        matrix, dangling, damping_factor, tolerance, max_iterations
+    )
+    return dict(zip(pages, ranks.tolist())), iterations, final_residual
+
+
+def sparse_pagerank(corpus, damping_factor, tolerance=TOLERANCE,
+                    max_iterations=MAX_ITERATIONS):
+    """
+    Return PageRank values for each page, as `iterate_pagerank` does, by
+    power iteration over a sparse transition matrix.
+    """
+    ranks, _, _ = solve_pagerank(
+        corpus, damping_factor, "power", tolerance, max_iterations
+    )
+    return ranks